@@ -0,0 +1,86 @@
+"""
+Time the vectorized accrual engine on a synthetic portfolio, the way the
+services call it: from transaction documents as the driver returns them.
+
+    python benchmarks/accrual.py --rows 1000000
+
+``columns_ms`` is building the arrays from the documents, ``accrue_ms`` the
+vectorized accrual on them and ``total_ms`` the two together
+(``accrue_documents``).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.accrual import FREQUENCY_CODES, accrue, accrue_documents, to_columns  # noqa: E402
+
+
+def documents(rows: int) -> list[dict]:
+    """Transactions shaped like the ones read from Mongo (datetimes, optional frequency)."""
+    rng = np.random.default_rng(0)
+    frequencies = list(FREQUENCY_CODES)
+    principal = rng.uniform(1_000, 100_000, rows).tolist()
+    rate = rng.uniform(0.5, 5, rows).tolist()
+    percentage = (rng.random(rows) < 0.8).tolist()
+    frequency = rng.integers(0, len(frequencies), rows).tolist()
+    offset = rng.integers(0, 3650, rows).tolist()
+    start = datetime(2015, 1, 1)
+    return [
+        {
+            "adjusted_principal": principal[i],
+            "interest_value": rate[i],
+            "interest_type": "percentage" if percentage[i] else "flat",
+            "frequency": frequencies[frequency[i]],
+            "transaction_date": start + timedelta(days=offset[i]),
+        }
+        for i in range(rows)
+    ]
+
+
+def _ms(timings: list[float]) -> dict:
+    return {
+        "best_ms": round(min(timings) * 1000, 2),
+        "median_ms": round(sorted(timings)[len(timings) // 2] * 1000, 2),
+    }
+
+
+def main(rows: int, repeat: int):
+    txns = documents(rows)
+    as_of = date.today()
+
+    columns_timings, accrue_timings, total_timings = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        columns = to_columns(txns)
+        columns_timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        accrue(as_of=np.datetime64(as_of, "D"), **columns)
+        accrue_timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        accrued, balance = accrue_documents(txns, as_of)
+        total_timings.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        "rows": rows,
+        "columns_ms": _ms(columns_timings),
+        "accrue_ms": _ms(accrue_timings),
+        "total_ms": _ms(total_timings),
+        "total_accrued": round(float(accrued.sum()), 2),
+        "total_balance": round(float(balance.sum()), 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
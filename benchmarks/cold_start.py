@@ -0,0 +1,73 @@
+"""
+Startup profile: per-module import time for `main` and process start to first served request.
+
+    python benchmarks/cold_start.py [--top 25] [--port 8765] [--path /api/auth/profile]
+
+The default probe path needs no database (it answers 401 without a token),
+so the measurement covers interpreter start, imports and app startup only.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(top: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    total = next((m["cumulative_ms"] for m in modules if m["module"] == "main"), None)
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return {"import_main_ms": total, "slowest": modules[:top]}
+
+
+def time_to_first_request(port: int, path: str, timeout: float = 60) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1)
+                break
+            except urllib.error.HTTPError:
+                break  # any HTTP status means the app served the request
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        else:
+            raise TimeoutError("server did not answer in time")
+        return (time.perf_counter() - start) * 1000
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/api/auth/profile")
+    args = parser.parse_args()
+
+    report = import_profile(args.top)
+    report["time_to_first_request_ms"] = round(time_to_first_request(args.port, args.path), 1)
+    print(json.dumps(report, indent=2))
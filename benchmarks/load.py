@@ -0,0 +1,612 @@
+"""
+Load test every API route against a freshly seeded database.
+
+    python benchmarks/load.py --memory                                # in-process mongomock stand-in
+    python benchmarks/load.py --mongod                                # throwaway local mongod
+    python benchmarks/load.py --mongo-uri mongodb://localhost:27017   # existing server
+
+``main:app`` is served by uvicorn inside this process. The harness seeds
+--lenders x --borrowers x --transactions documents into its own database
+(DB_NAME, default ``loan_bench``, which is wiped first). It then drives each
+route with --requests requests at --concurrency and reports throughput and
+p50/p95/p99. Results are written to benchmarks/results/ as JSON. Pass
+``--compare <previous.json>`` to exit non-zero when a route's p95 regresses by
+more than --threshold. ``--workers N`` serves the app from N uvicorn processes
+instead, so runs at different N show how throughput scales with cores.
+
+Requires ``httpx`` and ``uvicorn``. --memory also needs ``mongomock-motor``. It
+has no query planner, so only compare --memory runs with other --memory runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+PASSWORD = "bench-password"
+BATCH = 1000
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def summary(samples, statuses, wall):
+    return {
+        "count": len(samples),
+        "errors": sum(n for code, n in statuses.items() if int(code) >= 400),
+        "statuses": statuses,
+        "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples, default=0.0) * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- database backends ------------------------------------------------------
+
+def start_mongod(binary: str):
+    """Start a throwaway mongod on a free port; returns (uri, process, dbpath)."""
+    dbpath = tempfile.mkdtemp(prefix="loan-bench-")
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(port, process, "mongod")
+    return f"mongodb://127.0.0.1:{port}", process, dbpath
+
+
+def wait_for_port(port: int, process: subprocess.Popen, name: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline and process.poll() is None:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} did not start within {timeout:.0f}s")
+
+
+def start_workers(port: int, workers: int) -> subprocess.Popen:
+    """Serve main:app from `workers` uvicorn processes; they share the harness environment."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, "WEB_CONCURRENCY": str(workers)},
+    )
+    wait_for_port(port, process, "uvicorn")
+    return process
+
+
+def use_memory_database():
+    """Make database.connect() hand out a mongomock-motor client instead of a real one."""
+    import database
+    import mongomock_motor
+    from bson import ObjectId
+    from mongomock import aggregate
+    from mongomock.collection import BulkOperationBuilder
+
+    # Fill the gaps the app hits: $toObjectId in the export lookup, $unionWith
+    # in the dashboard and the `sort` keyword newer pymongo passes to bulk updates
+    aggregate.type_convertion_operators.append("$toObjectId")
+    convert = aggregate._Parser._handle_type_convertion_operator
+
+    def handle_conversion(self, operator, values):
+        if operator == "$toObjectId":
+            return ObjectId(self.parse(values))
+        return convert(self, operator, values)
+
+    aggregate._Parser._handle_type_convertion_operator = handle_conversion
+
+    def union_with(in_collection, db, options):
+        options = {"coll": options} if isinstance(options, str) else options
+        return in_collection + list(db[options["coll"]].aggregate(options.get("pipeline", [])))
+
+    aggregate._PIPELINE_HANDLERS["$unionWith"] = union_with
+    for name in ("add_update", "add_replace"):
+        original = getattr(BulkOperationBuilder, name)
+        setattr(BulkOperationBuilder, name, lambda self, *a, sort=None, _f=original, **k: _f(self, *a, **k))
+
+    client = mongomock_motor.AsyncMongoMockClient()
+
+    def connect(uri=None):
+        database.client = client
+        database.db = client[os.environ["DB_NAME"]]
+        return database.db
+
+    database.connect = connect
+    database.close = lambda: None
+
+
+# --- seeding ----------------------------------------------------------------
+
+def borrower_payload(rng: random.Random, tag: str) -> dict:
+    first = rng.choice(["Asha", "Ravi", "Meera", "John", "Li", "Sara", "Omar", "Nina"])
+    last = rng.choice(["Patel", "Smith", "Khan", "Garcia", "Wong", "Iyer", "Brown"])
+    return {
+        "first_name": first,
+        "last_name": last,
+        "email": f"{first.lower()}.{tag}@bench.example.com",
+        "dob": f"{rng.randint(1950, 2004)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "address": f"{rng.randint(1, 999)} Market Street",
+        "country": "India",
+        "state": "MH",
+        "pincode": str(rng.randint(400000, 499999)),
+        "phone": str(rng.randint(7000000000, 9999999999)),
+        "city": "Pune",
+    }
+
+
+def transaction_payload(rng: random.Random, borrower_id: str) -> dict:
+    percentage = rng.random() < 0.7
+    return {
+        "borrower_id": borrower_id,
+        "principal_amount": float(rng.randint(1, 500) * 100),
+        "interest_type": "percentage" if percentage else "flat",
+        "interest_value": float(rng.randint(1, 24)) if percentage else float(rng.randint(10, 500)),
+        "frequency": rng.choice(["daily", "monthly", "yearly"]) if percentage else None,
+        "transaction_date": (date(2021, 1, 1) + timedelta(days=rng.randint(0, 1400))).isoformat(),
+        "note": "",
+    }
+
+
+async def insert_batched(collection, documents):
+    ids = []
+    for start in range(0, len(documents), BATCH):
+        result = await collection.insert_many(documents[start:start + BATCH])
+        ids += [str(_id) for _id in result.inserted_ids]
+    return ids
+
+
+async def seed(args, rng: random.Random) -> list[dict]:
+    """Write the dataset straight to the database, shaped by the same helpers the services use."""
+    import database
+    from model.borrower import BorrowerModel
+    from model.transaction import TransactionModel
+    from services.balance import rebuild_rollups
+    from services.borrower import _borrower_document
+    from services.transaction import prepare_transaction, new_transaction_fields
+    from utils.auth import hash_password, create_token
+
+    for name in ("users", "borrower", "transactions", "balances"):
+        await database.get_database()[name].delete_many({})
+
+    hashed = hash_password(PASSWORD)
+    # Every delete request consumes one document, so seed spares for them
+    spares = args.requests
+    lenders = []
+    for i in range(args.lenders):
+        email = f"lender{i}@bench.example.com"
+        user = await database.users_collection.insert_one({
+            "first_name": "Lender", "last_name": str(i), "email": email,
+            "phone": "0000000000", "password": hashed,
+        })
+        lender_id = str(user.inserted_id)
+
+        borrowers = [
+            _borrower_document(BorrowerModel(**borrower_payload(rng, f"{i}.{j}")), lender_id)
+            for j in range(args.borrowers + spares)
+        ]
+        borrower_ids = await insert_batched(database.borrower_collection, borrowers)
+
+        # The dataset proper, then one spare per delete request spread over the same borrowers
+        owners = [b for b in borrower_ids[:args.borrowers] for _ in range(args.transactions)]
+        owners += [rng.choice(borrower_ids[:args.borrowers]) for _ in range(spares)] if args.borrowers else []
+        transactions = []
+        for borrower_id in owners:
+            txn = prepare_transaction(TransactionModel(**transaction_payload(rng, borrower_id)))
+            txn.update(new_transaction_fields(txn, lender_id))
+            transactions.append(txn)
+        txns = list(zip(await insert_batched(database.transactions_collection, transactions), owners))
+        cut = args.borrowers * args.transactions
+
+        lenders.append({
+            "email": email,
+            "headers": {"Authorization": f"Bearer {create_token({'email': email})}"},
+            "borrower_ids": borrower_ids[:args.borrowers],
+            "spare_borrower_ids": borrower_ids[args.borrowers:],
+            "txns": txns[:cut],  # (txn_id, borrower_id)
+            "spare_txn_ids": [txn_id for txn_id, _ in txns[cut:]],
+        })
+
+    await rebuild_rollups()
+    return lenders
+
+
+# --- scenarios --------------------------------------------------------------
+# Each scenario issues exactly one timed request; any setup it needs comes from the seed.
+
+def _counter():
+    value = 0
+    while True:
+        value += 1
+        yield value
+
+
+_unique = _counter()
+
+
+async def signup(client, lender, rng):
+    email = f"signup{next(_unique)}.{os.getpid()}@bench.example.com"
+    return await client.post("/api/auth/signup", json={
+        "first_name": "New", "last_name": "User", "email": email, "phone": "0",
+        "password": PASSWORD, "confirm_password": PASSWORD,
+    })
+
+
+async def signin(client, lender, rng):
+    return await client.post("/api/auth/signin", json={"email": lender["email"], "password": PASSWORD})
+
+
+async def get_profile(client, lender, rng):
+    return await client.get("/api/auth/profile", headers=lender["headers"])
+
+
+async def update_profile(client, lender, rng):
+    return await client.put("/api/auth/profile", headers=lender["headers"], json={
+        "first_name": "Lender", "last_name": "Bench", "phone": str(rng.randint(1, 10 ** 9)),
+    })
+
+
+async def add_borrower(client, lender, rng):
+    return await client.post("/api/borrower/", headers=lender["headers"],
+                             json=borrower_payload(rng, f"new{next(_unique)}"))
+
+
+async def edit_borrower(client, lender, rng):
+    payload = borrower_payload(rng, f"edit{next(_unique)}")
+    return await client.post("/api/borrower/", headers=lender["headers"], json=payload,
+                             params={"borrower_id": rng.choice(lender["borrower_ids"])})
+
+
+async def bulk_borrowers(client, lender, rng):
+    rows = [borrower_payload(rng, f"bulk{next(_unique)}") for _ in range(10)]
+    body = "\n".join(json.dumps(row) for row in rows)
+    return await client.post("/api/borrower/bulk", headers=lender["headers"], content=body,
+                             params={"format": "ndjson"})
+
+
+async def export_borrowers(client, lender, rng):
+    return await client.get("/api/borrower/export", headers=lender["headers"])
+
+
+async def get_borrower(client, lender, rng):
+    return await client.get(f"/api/borrower/{rng.choice(lender['borrower_ids'])}", headers=lender["headers"])
+
+
+async def list_borrowers(client, lender, rng):
+    return await client.get("/api/borrower/", headers=lender["headers"], params={"limit": 20})
+
+
+async def search_borrowers(client, lender, rng):
+    return await client.get("/api/borrower/", headers=lender["headers"],
+                            params={"limit": 20, "search": rng.choice(["pat", "smith", "asha", "ravi k"])})
+
+
+async def delete_borrower(client, lender, rng):
+    if not lender["spare_borrower_ids"]:
+        return None
+    return await client.delete(f"/api/borrower/{lender['spare_borrower_ids'].pop()}", headers=lender["headers"])
+
+
+async def add_transaction(client, lender, rng):
+    return await client.post("/api/transaction/", headers=lender["headers"],
+                             json=transaction_payload(rng, rng.choice(lender["borrower_ids"])))
+
+
+async def bulk_transactions(client, lender, rng):
+    operations = [
+        {"op": "create", "data": transaction_payload(rng, rng.choice(lender["borrower_ids"]))}
+        for _ in range(10)
+    ]
+    return await client.post("/api/transaction/bulk", headers=lender["headers"], json={"operations": operations})
+
+
+async def update_transaction(client, lender, rng):
+    if not lender["txns"]:
+        return None
+    # Keep the borrower unchanged so the request measures the single round trip path
+    txn_id, borrower_id = rng.choice(lender["txns"])
+    return await client.put(f"/api/transaction/{txn_id}", headers=lender["headers"],
+                            json=transaction_payload(rng, borrower_id))
+
+
+async def add_repayment(client, lender, rng):
+    if not lender["txns"]:
+        return None
+    # Small amounts so the run doesn't close the transactions later scenarios use
+    txn_id, _ = rng.choice(lender["txns"])
+    return await client.post(f"/api/transaction/{txn_id}/repayments", headers=lender["headers"],
+                             json={"amount": 1.0})
+
+
+async def list_repayments(client, lender, rng):
+    if not lender["txns"]:
+        return None
+    txn_id, _ = rng.choice(lender["txns"])
+    return await client.get(f"/api/transaction/{txn_id}/repayments", headers=lender["headers"])
+
+
+async def poll_unchanged(client, lender, rng):
+    # Dashboard-style polling: replays the last ETag, so steady state is all 304s
+    tag = lender.setdefault("etags", {}).get("transactions")
+    headers = {**lender["headers"], "If-None-Match": tag} if tag else lender["headers"]
+    response = await client.get("/api/transaction/", headers=headers, params={"limit": 20})
+    lender["etags"]["transactions"] = response.headers.get("etag", tag)
+    return response
+
+
+async def delete_transaction(client, lender, rng):
+    if not lender["spare_txn_ids"]:
+        return None
+    return await client.delete(f"/api/transaction/{lender['spare_txn_ids'].pop()}", headers=lender["headers"])
+
+
+async def export_transactions(client, lender, rng):
+    return await client.get("/api/transaction/export", headers=lender["headers"])
+
+
+async def lender_summary(client, lender, rng):
+    return await client.get("/api/transaction/summary", headers=lender["headers"])
+
+
+async def borrower_summary(client, lender, rng):
+    return await client.get(f"/api/transaction/summary/{rng.choice(lender['borrower_ids'])}", headers=lender["headers"])
+
+
+async def transaction_schedule(client, lender, rng):
+    if not lender["txns"]:
+        return None
+    txn_id, _ = rng.choice(lender["txns"])
+    return await client.get(f"/api/transaction/{txn_id}/schedule", headers=lender["headers"],
+                            params={"from": "2024-01-01", "to": "2025-12-31"})
+
+
+async def dashboard(client, lender, rng):
+    return await client.get("/api/dashboard", headers=lender["headers"])
+
+
+async def list_transactions(client, lender, rng):
+    return await client.get("/api/transaction/", headers=lender["headers"], params={"limit": 20})
+
+
+async def list_transactions_by_borrower(client, lender, rng):
+    return await client.get("/api/transaction/", headers=lender["headers"],
+                            params={"limit": 20, "borrower_id": rng.choice(lender["borrower_ids"]), "status": "active"})
+
+
+# Order matters: reads run before the writes and deletes that reshape the data
+SCENARIOS = {
+    "GET /api/auth/profile": get_profile,
+    "GET /api/borrower/{borrower_id}": get_borrower,
+    "GET /api/borrower/": list_borrowers,
+    "GET /api/borrower/?search": search_borrowers,
+    "GET /api/borrower/export": export_borrowers,
+    "GET /api/transaction/": list_transactions,
+    "GET /api/transaction/?borrower_id": list_transactions_by_borrower,
+    "GET /api/transaction/ (If-None-Match)": poll_unchanged,
+    "GET /api/transaction/summary": lender_summary,
+    "GET /api/dashboard": dashboard,
+    "GET /api/transaction/summary/{borrower_id}": borrower_summary,
+    "GET /api/transaction/export": export_transactions,
+    "GET /api/transaction/{txn_id}/schedule": transaction_schedule,
+    "GET /api/transaction/{txn_id}/repayments": list_repayments,
+    "POST /api/auth/signin": signin,
+    "POST /api/auth/signup": signup,
+    "PUT /api/auth/profile": update_profile,
+    "POST /api/borrower/": add_borrower,
+    "POST /api/borrower/?borrower_id": edit_borrower,
+    "POST /api/borrower/bulk": bulk_borrowers,
+    "POST /api/transaction/": add_transaction,
+    "POST /api/transaction/bulk": bulk_transactions,
+    "PUT /api/transaction/{txn_id}": update_transaction,
+    "POST /api/transaction/{txn_id}/repayments": add_repayment,
+    "DELETE /api/transaction/{txn_id}": delete_transaction,
+    "DELETE /api/borrower/{borrower_id}": delete_borrower,
+}
+
+
+async def drive(client, scenario, lenders, args, rng):
+    samples, statuses = [], {}
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await scenario(client, rng.choice(lenders), rng)
+            if response is None:
+                continue
+            # Streaming routes are timed to the last byte
+            await response.aread()
+            samples.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return summary(samples, statuses, time.perf_counter() - started)
+
+
+# --- reporting --------------------------------------------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(routes):
+    print(f"{'route':<44}{'n':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, stats in routes.items():
+        print(f"{name:<44}{stats['count']:>6}{stats['errors']:>5}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+
+def compare(previous_path, routes, threshold):
+    """Print p95 deltas against an earlier result file; returns the regressed route names."""
+    with open(previous_path) as f:
+        previous = json.load(f)["routes"]
+    regressed = []
+    print(f"\n{'route':<44}{'p95 before':>12}{'p95 now':>10}{'change':>9}")
+    for name, stats in routes.items():
+        if name not in previous or not previous[name]["p95_ms"]:
+            continue
+        before, now = previous[name]["p95_ms"], stats["p95_ms"]
+        change = (now - before) / before
+        flag = "  REGRESSED" if change > threshold else ""
+        print(f"{name:<44}{before:>12}{now:>10}{change:>+9.0%}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+async def run(args):
+    import httpx
+    import uvicorn
+    import database
+    import main
+
+    port = free_port()
+    if args.workers > 1:
+        # Worker processes can't share an in-memory database, so this needs --mongod or --mongo-uri
+        workers = start_workers(port, args.workers)
+        database.connect()
+    else:
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.05)
+
+    try:
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        lenders = await seed(args, rng)
+        seed_seconds = time.perf_counter() - started
+        print(f"seeded {args.lenders} lenders x {args.borrowers} borrowers x {args.transactions} transactions "
+              f"in {seed_seconds:.1f}s")
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        routes = {}
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            for name, scenario in SCENARIOS.items():
+                if args.routes and not any(pattern in name for pattern in args.routes):
+                    continue
+                routes[name] = await drive(client, scenario, lenders, args, rng)
+    finally:
+        if args.workers > 1:
+            workers.terminate()
+            workers.wait()
+        else:
+            server.should_exit = True
+            await serving
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "backend": "memory" if args.memory else "mongod" if args.mongod else args.mongo_uri,
+            "lenders": args.lenders,
+            "borrowers": args.borrowers,
+            "transactions": args.transactions,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "routes": routes,
+    }
+
+
+def main(args):
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ.setdefault("DB_NAME", "loan_bench")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    sys.path.insert(0, ROOT)
+
+    mongod = None
+    if args.memory and args.workers > 1:
+        sys.exit("--workers needs --mongod or --mongo-uri; worker processes can't share --memory")
+    if args.workers > 1:
+        os.environ.setdefault("INVALIDATION_BUS", "true")
+    if args.memory:
+        os.environ.update({"ENSURE_INDEXES": "false", "MONGO_WARM_UP": "false"})
+        use_memory_database()
+    elif args.mongod:
+        binary = shutil.which(args.mongod_binary)
+        if binary is None:
+            sys.exit(f"{args.mongod_binary} not found on PATH")
+        uri, mongod, dbpath = start_mongod(binary)
+        os.environ["MONGO_URI"] = uri
+    else:
+        os.environ["MONGO_URI"] = args.mongo_uri
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if mongod is not None:
+            mongod.terminate()
+            mongod.wait()
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    print_table(result["routes"])
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare and compare(args.compare, result["routes"], args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("--memory", action="store_true", help="in-process mongomock-motor database")
+    backend.add_argument("--mongod", action="store_true", help="start a throwaway local mongod")
+    backend.add_argument("--mongo-uri", help="use an existing server (DB_NAME is wiped)")
+    parser.add_argument("--mongod-binary", default="mongod")
+    parser.add_argument("--lenders", type=int, default=5)
+    parser.add_argument("--borrowers", type=int, default=100, help="per lender")
+    parser.add_argument("--transactions", type=int, default=10, help="per borrower")
+    parser.add_argument("--requests", type=int, default=200, help="per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (needs a real mongod)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--routes", nargs="*", help="only run routes whose name contains one of these")
+    parser.add_argument("--output", help="result file (default benchmarks/results/load-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff p95 against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 increase counted as a regression")
+    main(parser.parse_args())
@@ -0,0 +1,76 @@
+"""
+Compare CPU per 100-row transaction page: the old serialize_mongo_documents +
+stdlib JSONResponse path against MongoJSONResponse.
+
+    python benchmarks/serialization.py --rows 100 --repeat 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.comman import MongoJSONResponse, custom_pagination_response  # noqa: E402
+
+
+def make_page(rows: int) -> list[dict]:
+    return [{
+        "_id": ObjectId(),
+        "borrower_id": str(ObjectId()),
+        "borrower_name": "Jane Doe",
+        "principal_amount": 1000.0 + i,
+        "interest_type": "percentage",
+        "interest_value": 2.5,
+        "frequency": "monthly",
+        "transaction_date": datetime(2024, 1, 1 + i % 28),
+        "note": "",
+        "adjusted_principal": 1000.0 + i,
+        "interest_amount": 25.0,
+        "total_balance": 1025.0 + i,
+        "status": "active",
+    } for i in range(rows)]
+
+
+def legacy_render(docs: list[dict]) -> bytes:
+    # What custom_response did before: copy each document, then stdlib json
+    serialized = [{k: (str(v) if isinstance(v, ObjectId) else v.isoformat() if isinstance(v, datetime) else v)
+                   for k, v in doc.items()} for doc in docs]
+    content = {"status": 200, "message": "Transaction list fetched"}
+    content.update({"data": custom_pagination_response(1, len(docs), len(docs), serialized)})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast_render(docs: list[dict]) -> bytes:
+    return MongoJSONResponse(content={
+        "status": 200,
+        "message": "Transaction list fetched",
+        "data": custom_pagination_response(1, len(docs), len(docs), docs),
+    }).body
+
+
+def bench(func, docs, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func(docs)
+    return (time.process_time() - start) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    page = make_page(args.rows)
+    legacy = bench(legacy_render, page, args.repeat)
+    fast = bench(fast_render, page, args.repeat)
+    print(json.dumps({
+        "rows": args.rows,
+        "legacy_us_per_page": round(legacy, 1),
+        "mongo_json_us_per_page": round(fast, 1),
+        "speedup": round(legacy / fast, 1),
+    }, indent=2))
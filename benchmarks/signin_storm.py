@@ -0,0 +1,99 @@
+"""
+Measure latency of an unrelated endpoint while the server handles a burst of sign-ins.
+
+Run the API (``python main.py``) and then:
+
+    python benchmarks/signin_storm.py --base-url http://localhost:8001 --storm 50 --duration 10
+
+Run it once against the commit before the bcrypt pool and once after to compare
+the ``probe`` p99 (GET /api/auth/profile) under the sign-in storm.
+Requires ``httpx``.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def summary(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+async def ensure_user(client, email, password):
+    await client.post("/api/auth/signup", json={
+        "first_name": "Bench",
+        "last_name": "User",
+        "email": email,
+        "phone": "0000000000",
+        "password": password,
+        "confirm_password": password,
+    })
+    response = await client.post("/api/auth/signin", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def signin_worker(client, email, password, deadline, samples, statuses):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/api/auth/signin", json={"email": email, "password": password})
+        samples.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def probe_worker(client, token, deadline, samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/api/auth/profile", headers=headers)
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.storm + 8)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token = await ensure_user(client, args.email, args.password)
+
+        baseline = []
+        await probe_worker(client, token, time.perf_counter() + 2, baseline)
+
+        signins, probes, statuses = [], [], {}
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            probe_worker(client, token, deadline, probes),
+            *[signin_worker(client, args.email, args.password, deadline, signins, statuses)
+              for _ in range(args.storm)],
+        )
+
+    print(json.dumps({
+        "probe_idle": summary(baseline),
+        "probe_under_storm": summary(probes),
+        "signin": summary(signins),
+        "signin_statuses": statuses,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--email", default="bench@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--storm", type=int, default=50, help="concurrent sign-in clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,15 @@
+"""
+Generate the OpenAPI schema at build time so the first /docs hit doesn't have to.
+
+    python build_openapi.py [output_path]
+"""
+import json
+import sys
+from config import OPENAPI_SCHEMA_PATH
+from main import build_openapi_schema
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else OPENAPI_SCHEMA_PATH
+    with open(path, "w") as f:
+        json.dump(build_openapi_schema(), f)
+    print(f"wrote {path}")
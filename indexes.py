@@ -0,0 +1,234 @@
+"""
+Declarative index registry for the app's collections.
+
+Indexes are reconciled on startup (see main.py) or from the command line:
+
+    python indexes.py            # create missing / changed indexes, drop stale managed ones
+    python indexes.py --check    # explain() every service query; fail on scans, post-join filters or empty collections
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from bson import ObjectId
+import database
+
+# Every managed index name starts with this prefix so reconciliation never
+# touches indexes created by hand.
+PREFIX = "app_"
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name=PREFIX + "email_unique", unique=True),
+    ],
+    "borrower": [
+        IndexModel([("lender_id", ASCENDING), ("_id", DESCENDING)], name=PREFIX + "lender_id"),
+        IndexModel([("lender_id", ASCENDING), ("search_tokens", ASCENDING)], name=PREFIX + "lender_search"),
+    ],
+    "transactions": [
+        IndexModel(
+            [("lender_id", ASCENDING), ("transaction_date", DESCENDING), ("_id", DESCENDING)],
+            name=PREFIX + "lender_date",
+        ),
+        IndexModel(
+            [("lender_id", ASCENDING), ("status", ASCENDING), ("transaction_date", DESCENDING), ("_id", DESCENDING)],
+            name=PREFIX + "lender_status_date",
+        ),
+        IndexModel(
+            [("borrower_id", ASCENDING), ("status", ASCENDING), ("transaction_date", DESCENDING), ("_id", DESCENDING)],
+            name=PREFIX + "borrower_status_date",
+        ),
+    ],
+    "balances": [
+        IndexModel([("lender_id", ASCENDING)], name=PREFIX + "lender_id"),
+    ],
+    "repayments": [
+        IndexModel([("transaction_id", ASCENDING), ("_id", ASCENDING)], name=PREFIX + "transaction"),
+    ],
+    # Bus events only matter for a few seconds; keep an hour for debugging
+    "invalidations": [
+        IndexModel([("at", ASCENDING)], name=PREFIX + "expire", expireAfterSeconds=3600),
+    ],
+}
+
+
+def _spec(document: dict) -> tuple:
+    options = {k: v for k, v in document.items() if k not in ("key", "name", "v", "ns", "background")}
+    return list(document["key"].items()), options
+
+
+async def ensure_indexes(db=None, drop_stale: bool = True) -> dict:
+    """Create missing indexes, rebuild changed ones and drop managed ones no longer declared."""
+    db = db if db is not None else database.get_database()
+    report = {}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = {}
+        async for index in collection.list_indexes():
+            existing[index["name"]] = dict(index)
+
+        created, dropped = [], []
+        to_create = []
+        for model in models:
+            wanted = model.document
+            current = existing.get(wanted["name"])
+            if current is not None and _spec(current) == _spec(wanted):
+                continue
+            if current is not None:
+                await collection.drop_index(wanted["name"])
+                dropped.append(wanted["name"])
+            to_create.append(model)
+        if to_create:
+            created = await collection.create_indexes(to_create)
+
+        if drop_stale:
+            declared = {model.document["name"] for model in models}
+            for name in existing:
+                if name.startswith(PREFIX) and name not in declared:
+                    await collection.drop_index(name)
+                    dropped.append(name)
+
+        report[collection_name] = {"created": created, "dropped": dropped}
+    return report
+
+
+def _find(collection: str, query: dict, sort: dict = None) -> tuple:
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = sort
+    return collection, command
+
+
+def _aggregate(collection, pipeline: list) -> tuple:
+    collection = getattr(collection, "name", collection)  # services hand back their collection proxy
+    return collection, {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+
+
+def _sample_queries() -> dict:
+    """The queries the services issue, built by their own helpers and keyed by a readable label."""
+    # The services pull in the whole app, which reconciling indexes doesn't need
+    from services.borrower import search_pipeline
+    from services.dashboard import dashboard_pipeline
+    from services.transaction import export_query, list_pipeline
+    from utils.search import search_query
+
+    lender_id = str(ObjectId())
+    borrower_id = str(ObjectId())
+    count = [{"$count": "count"}]
+    borrower_search = {"lender_id": lender_id, **search_query("jo")}
+    return {
+        "get_current_user": _find("users", {"email": "check@example.com"}),
+        "get_borrowers_service": _find("borrower", {"lender_id": lender_id}, {"_id": DESCENDING}),
+        "get_borrowers_service[search]": _aggregate("borrower", search_pipeline(borrower_search, "jo")),
+        "get_borrower_details_service": _find("borrower", {"_id": ObjectId(), "lender_id": lender_id}),
+        "export_borrowers_service": _find("borrower", {"lender_id": lender_id}, {"_id": DESCENDING}),
+        "list_transactions_service": _aggregate(*list_pipeline(
+            {"lender_id": lender_id}, "transaction_date", count_stages=count)),
+        "list_transactions_service[count=false]": _aggregate(*list_pipeline(
+            {"lender_id": lender_id}, "transaction_date")),
+        "list_transactions_service[status]": _aggregate(*list_pipeline(
+            {"lender_id": lender_id, "status": "active"}, "transaction_date", count_stages=count)),
+        "list_transactions_service[borrower]": _aggregate(*list_pipeline(
+            {"lender_id": lender_id, "borrower_id": borrower_id, "status": "active"}, "transaction_date",
+            count_stages=count)),
+        "list_transactions_service[search]": _aggregate(*list_pipeline(
+            {"lender_id": lender_id}, "transaction_date", "jo", count_stages=count)),
+        "list_transactions_service[search,borrower]": _aggregate(*list_pipeline(
+            {"lender_id": lender_id, "borrower_id": borrower_id}, "transaction_date", "jo")),
+        "export_transactions_service": _find(
+            "transactions", export_query(lender_id, borrower_id, "active"), {"_id": DESCENDING}),
+        "get_dashboard_service": _aggregate("transactions", dashboard_pipeline(
+            lender_id, [date.today().strftime("%Y-%m")])),
+        "list_repayments_service": _find("repayments", {"transaction_id": str(ObjectId())}, {"_id": ASCENDING}),
+    }
+
+
+def _stages(plan: dict):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def _winning_plans(explain):
+    """Every winning plan in an explain, including those of $cursor, $lookup and $unionWith stages."""
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+
+def _joined_filters(pipeline: list, joined: frozenset = frozenset()):
+    """
+    Fields matched on after a $lookup produced them. Every input document is
+    joined before that filter runs, and each join is an _id IXSCAN, so explain
+    alone never flags it.
+    """
+    for stage in pipeline:
+        for operator, options in stage.items():
+            if operator == "$lookup":
+                joined = joined | {options["as"]}
+            elif operator == "$match":
+                for field in options:
+                    if field.split(".")[0] in joined:
+                        yield field
+            elif operator == "$facet":
+                for branch in options.values():
+                    yield from _joined_filters(branch, joined)
+
+
+async def check_query_plans(db=None) -> dict:
+    """
+    Return {label: reason} for every sample query that scans a collection,
+    filters after a join or can't be checked.
+    """
+    db = db if db is not None else database.get_database()
+    failures = {}
+    for label, (collection, command) in _sample_queries().items():
+        filtered = list(_joined_filters(command.get("pipeline", [])))
+        if filtered:
+            failures[label] = f"filters on joined fields {filtered}, index the match before the $lookup"
+            continue
+        # An empty or missing collection always explains as EOF, which proves nothing
+        if not await db[collection].estimated_document_count():
+            failures[label] = f"{collection} is empty, seed it before checking"
+            continue
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        for plan in _winning_plans(explain):
+            stages = list(_stages(plan))
+            if "COLLSCAN" in stages:
+                failures[label] = "COLLSCAN: " + " <- ".join(stages)
+                break
+    return failures
+
+
+async def _main(args) -> int:
+    if args.check:
+        failures = await check_query_plans()
+        for label, reason in failures.items():
+            print(f"{label}: {reason}")
+        print("ok" if not failures else f"{len(failures)} query(s) failed the check")
+        return 1 if failures else 0
+
+    report = await ensure_indexes(drop_stale=not args.keep_stale)
+    for collection_name, changes in report.items():
+        print(f"{collection_name}: created={changes['created']} dropped={changes['dropped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile or check MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="fail if any service query plans a COLLSCAN")
+    parser.add_argument("--keep-stale", action="store_true", help="don't drop managed indexes no longer declared")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,23 @@
+"""
+Backfill borrower search fields in batches.
+
+    python -m jobs.backfill_search [--batch-size 500] [--all]
+"""
+import argparse
+import asyncio
+from utils import invalidation
+from services.borrower import backfill_search_fields
+
+
+async def main(batch_size: int, rebuild: bool):
+    updated = await backfill_search_fields(batch_size, rebuild)
+    await invalidation.flush()
+    print(f"backfilled search fields on {updated} borrower(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--all", action="store_true", help="recompute search fields on every borrower")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.all))
@@ -0,0 +1,24 @@
+"""
+Recompute balance rollups from the transactions and report drift.
+
+    python -m jobs.rebuild_balances [--lender-id ID] [--verify-only]
+"""
+import argparse
+import asyncio
+import json
+from utils import invalidation
+from services.balance import rebuild_rollups
+
+
+async def main(args):
+    report = await rebuild_rollups(args.lender_id, fix=not args.verify_only)
+    await invalidation.flush()
+    print(json.dumps(report, indent=2))
+    return 1 if report["drifted"] and args.verify_only else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lender-id", default=None)
+    parser.add_argument("--verify-only", action="store_true", help="report drift without rewriting rollups")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,24 @@
+"""
+Replay the repayment ledger and verify every transaction's outstanding balance.
+
+    python -m jobs.verify_repayments [--lender-id ID] [--fix]
+"""
+import argparse
+import asyncio
+import json
+from utils import invalidation
+from services.repayment import verify_ledger
+
+
+async def main(args):
+    report = await verify_ledger(args.lender_id, fix=args.fix)
+    await invalidation.flush()
+    print(json.dumps(report, indent=2))
+    return 1 if report["drifted"] and not args.fix else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lender-id", default=None)
+    parser.add_argument("--fix", action="store_true", help="rewrite drifted balances and their rollups")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
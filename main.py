@@ -1,16 +1,57 @@
-from fastapi import FastAPI
-from routes import auth, borrower, transaction
+from fastapi import FastAPI, Response
+from routes import auth, borrower, transaction, dashboard
 from fastapi.openapi.utils import get_openapi
 from fastapi.routing import APIRoute
 from services.auth import get_current_user
-from utils.comman import  validation_exception_handler
+from utils.comman import  validation_exception_handler, MongoJSONResponse
+from utils.auth import shutdown_password_pool
+from utils import invalidation
+from indexes import ensure_indexes
+from config import (
+    ENSURE_INDEXES, MONGO_WARM_UP, OPENAPI_SCHEMA_PATH, OPENAPI_PREBUILT, METRICS_ENABLED, ADMISSION_ENABLED,
+    INVALIDATION_BUS, WEB_CONCURRENCY, GRACEFUL_SHUTDOWN_TIMEOUT
+)
+from contextlib import asynccontextmanager
+import database
 from fastapi.exceptions import RequestValidationError
-import uvicorn
+import asyncio
+import json
+import logging
 import os
 from fastapi.middleware.cors import CORSMiddleware
 
 
-app = FastAPI()
+async def prepare_database():
+    # Separate steps, so a transient warm-up failure can't skip index reconciliation
+    logger = logging.getLogger("uvicorn.error")
+    if MONGO_WARM_UP:
+        try:
+            await database.warm_up()
+        except Exception as e:
+            logger.warning(f"Database warm-up failed: {str(e)}")
+    if ENSURE_INDEXES:
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Index reconciliation failed: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.connect()
+    # Warm-up and index reconciliation run alongside the first requests
+    # instead of delaying them.
+    startup_task = asyncio.create_task(prepare_database())
+    bus_task = asyncio.create_task(invalidation.run()) if INVALIDATION_BUS else None
+    yield
+    startup_task.cancel()
+    if bus_task is not None:
+        bus_task.cancel()
+    shutdown_password_pool()
+    database.close()
+
+
+app = FastAPI(default_response_class=MongoJSONResponse, lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",  # your Next.js dev server
@@ -18,6 +59,12 @@ origins = [
     "http://localhost:3002"
 ]
 
+if ADMISSION_ENABLED:
+    from utils.admission import AdmissionMiddleware
+
+    # Inside CORS so browsers can read the 503s it sheds
+    app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,  # or ["*"] for testing
@@ -26,9 +73,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
+if METRICS_ENABLED:
+    from utils import metrics
+
+    # Added last so it wraps everything, CORS included
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        from services.auth import get_auth_cache_stats
+        from utils.count import count_cache
+        from services.dashboard import dashboard_cache
+
+        caches = {**get_auth_cache_stats(), "counts": count_cache.stats(), "dashboards": dashboard_cache.stats()}
+        return Response(metrics.render(caches), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def build_openapi_schema():
     openapi_schema = get_openapi(
         title="Your API",
         version="1.0.0",
@@ -53,7 +113,17 @@ def custom_openapi():
                     if "security" not in openapi_schema["paths"][path][method]:
                         openapi_schema["paths"][path][method]["security"] = [{"BearerAuth": []}]
 
-    app.openapi_schema = openapi_schema
+    return openapi_schema
+
+def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+    # Prefer the schema generated by this deploy's build step (build_openapi.py)
+    if OPENAPI_PREBUILT and os.path.exists(OPENAPI_SCHEMA_PATH):
+        with open(OPENAPI_SCHEMA_PATH) as f:
+            app.openapi_schema = json.load(f)
+    else:
+        app.openapi_schema = build_openapi_schema()
     return app.openapi_schema
 
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -63,7 +133,18 @@ app.openapi = custom_openapi
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(borrower.router, prefix="/api/borrower")
 app.include_router(transaction.router, prefix="/api/transaction")
+app.include_router(dashboard.router, prefix="/api/dashboard")
 
 if __name__ == "__main__":
+    import uvicorn
     port = int(os.environ.get("PORT", 8001))  # Render sets $PORT dynamically
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
+    # With several workers uvicorn supervises them: crashed workers are replaced,
+    # SIGHUP restarts them one by one and in-flight requests get
+    # GRACEFUL_SHUTDOWN_TIMEOUT seconds to finish on shutdown
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=WEB_CONCURRENCY,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Literal,Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal,Optional
 from datetime import date
 
 class TransactionModel(BaseModel):
@@ -10,3 +10,16 @@ class TransactionModel(BaseModel):
     frequency: Optional[Literal["daily", "monthly", "yearly"]] = None
     transaction_date: date
     note: Optional[str] = ""
+
+class BulkTransactionOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    txn_id: Optional[str] = None  # required for update and delete
+    data: Optional[TransactionModel] = None  # required for create and update
+
+class BulkTransactionModel(BaseModel):
+    operations: List[BulkTransactionOperation]
+
+class RepaymentModel(BaseModel):
+    amount: float = Field(..., gt=0)
+    paid_on: Optional[date] = None  # defaults to today
+    note: Optional[str] = ""
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from model.borrower import BorrowerModel
-from typing import Optional
+from typing import Literal, Optional
 from services.borrower import (
     add_or_edit_borrower_service,
     delete_borrower_service,
     get_borrowers_service,
-    get_borrower_details_service
+    get_borrower_details_service,
+    bulk_import_borrowers_service,
+    export_borrowers_service
 )
 from services.auth import get_current_user
 from utils.comman import custom_response
+from utils.count import CountMode
+from utils.versions import conditional
 
 
 router = APIRouter(tags=["Barrower"])
@@ -37,11 +41,46 @@ async def add_borrower(
             f"Error while adding borrower: {str(e)}"
         )
 
+@router.post("/bulk")
+async def bulk_import_borrowers(
+    request: Request,
+    format: Optional[str] = None,  # "csv" or "ndjson"; defaults from Content-Type
+    current_user: dict = Depends(get_current_user),
+):
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        return custom_response(
+            status.HTTP_400_BAD_REQUEST,
+            "format must be csv or ndjson"
+        )
+    try:
+        return await bulk_import_borrowers_service(
+            request.stream(),  # Body is consumed incrementally, never buffered whole
+            fmt,
+            current_user["_id"]
+        )
+    except Exception as e:
+        return custom_response(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            f"Error while importing borrowers: {str(e)}"
+        )
+
+@router.get("/export")
+async def export_borrowers(
+    format: Literal["csv", "ndjson"] = "csv",
+    fields: Optional[str] = None,  # Comma separated columns, e.g. first_name,last_name,email
+    current_user: dict = Depends(get_current_user),
+):
+    return export_borrowers_service(current_user["_id"], format, fields)
+
 @router.get("/{borrower_id}")
-async def get_borrower(borrower_id: str,current_user: dict = Depends(get_current_user)):
+async def get_borrower(request: Request, borrower_id: str, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     try:
         lender_id = current_user["_id"]
-        return await get_borrower_details_service(borrower_id, lender_id)
+        return await conditional(
+            request, lender_id,
+            lambda: get_borrower_details_service(borrower_id, lender_id, fields)
+        )
     except Exception as e:
         return custom_response(
             status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -50,18 +89,26 @@ async def get_borrower(borrower_id: str,current_user: dict = Depends(get_current
 
 @router.get("/")
 async def list_borrowers(
+    request: Request,
     search : Optional[str]=None,
     page: int = 1,  # Pagination: page number
     limit: int = 8,  # Pagination: number of items per page
+    after: Optional[str] = None,  # Cursor pagination: next_cursor from the previous page
+    count: CountMode = "exact",  # "estimated" caps the count, "false" skips it (use has_more)
+    fields: Optional[str] = None,  # Comma separated columns, e.g. first_name,last_name,email
     current_user: dict = Depends(get_current_user),  # Extracts lender_id from token
 ):
     try:
-        response = await get_borrowers_service(
+        # Unchanged data answers 304 without touching the collection
+        response = await conditional(request, current_user["_id"], lambda: get_borrowers_service(
             search,
             current_user["_id"],  # Pass lender_id from token
             page,  # Pass page number
-            limit  # Pass limit for number of borrowers per page
-        )
+            limit,  # Pass limit for number of borrowers per page
+            after,
+            count,
+            fields
+        ))
         return response
     except Exception as e:
         return custom_response(
@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Depends, Request
+from services.dashboard import get_dashboard_service
+from services.auth import get_current_user
+from utils.versions import conditional
+
+router = APIRouter(tags=["Dashboard"])
+
+@router.get("")
+async def get_dashboard(request: Request, current_user: dict = Depends(get_current_user)):
+    return await conditional(request, current_user["_id"], lambda: get_dashboard_service(current_user))
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Query, Depends
-from model.transaction import TransactionModel
+from fastapi import APIRouter, Query, Depends, Request
+from model.transaction import TransactionModel, BulkTransactionModel, RepaymentModel
+from typing import Literal, Optional
+from datetime import date
 from services.transaction import (
     add_transaction_service,
     update_transaction_service,
     delete_transaction_service,
-    list_transactions_service
+    list_transactions_service,
+    bulk_transactions_service,
+    export_transactions_service,
+    get_schedule_service
 )
+from services.balance import get_lender_summary_service, get_borrower_summary_service
+from services.repayment import add_repayment_service, list_repayments_service
 from services.auth import get_current_user
+from utils.count import CountMode
+from utils.versions import conditional
 
 router = APIRouter(tags=["Transactions"])
 
@@ -14,6 +23,10 @@ router = APIRouter(tags=["Transactions"])
 async def add_transaction(txn: TransactionModel, current_user: dict = Depends(get_current_user)):
     return await add_transaction_service(txn, current_user)
 
+@router.post("/bulk")
+async def bulk_transactions(payload: BulkTransactionModel, current_user: dict = Depends(get_current_user)):
+    return await bulk_transactions_service(payload, current_user)
+
 @router.put("/{txn_id}")
 async def update_transaction(txn_id: str, txn: TransactionModel, current_user: dict = Depends(get_current_user)):
     return await update_transaction_service(txn_id, txn, current_user)
@@ -22,14 +35,59 @@ async def update_transaction(txn_id: str, txn: TransactionModel, current_user: d
 async def delete_transaction(txn_id: str, current_user: dict = Depends(get_current_user)):
     return await delete_transaction_service(txn_id, current_user)
 
+@router.get("/export")
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "csv",
+    borrower_id: str = "",
+    status: str = "",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    return export_transactions_service(current_user, format, borrower_id, status, fields)
+
+@router.get("/summary")
+async def lender_summary(as_of: Optional[date] = None, current_user: dict = Depends(get_current_user)):
+    return await get_lender_summary_service(current_user, as_of)
+
+@router.get("/summary/{borrower_id}")
+async def borrower_summary(borrower_id: str, as_of: Optional[date] = None, current_user: dict = Depends(get_current_user)):
+    return await get_borrower_summary_service(borrower_id, current_user, as_of)
+
+@router.get("/{txn_id}/schedule")
+async def transaction_schedule(
+    txn_id: str,
+    from_: Optional[date] = Query(None, alias="from"),  # first due date to include
+    to: Optional[date] = None,  # last due date to include
+    limit: Optional[int] = Query(None, ge=1),  # defaults to SCHEDULE_DEFAULT_LIMIT when `to` is not given
+    format: Literal["csv", "ndjson"] = "ndjson",
+    current_user: dict = Depends(get_current_user)
+):
+    return await get_schedule_service(txn_id, current_user, from_, to, limit, format)
+
+@router.post("/{txn_id}/repayments")
+async def add_repayment(txn_id: str, repayment: RepaymentModel, current_user: dict = Depends(get_current_user)):
+    return await add_repayment_service(txn_id, repayment, current_user)
+
+@router.get("/{txn_id}/repayments")
+async def list_repayments(txn_id: str, current_user: dict = Depends(get_current_user)):
+    return await list_repayments_service(txn_id, current_user)
+
 @router.get("/")
 async def list_transactions(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     search: str = "",
     borrower_id: str = "",
     status: str = "",
     sort_by: str = "transaction_date",
+    after: Optional[str] = None,
+    count: CountMode = "exact",
+    as_of: Optional[date] = None,  # adds accrued_interest / accrued_balance as of this date
+    fields: Optional[str] = None,  # comma separated columns, e.g. borrower_name,principal_amount,status
     current_user: dict = Depends(get_current_user)
 ):
-    return await list_transactions_service(page, limit, search,borrower_id, status, sort_by, current_user)
+    return await conditional(
+        request, current_user["_id"],
+        lambda: list_transactions_service(page, limit, search,borrower_id, status, sort_by, current_user, after, count, as_of, fields)
+    )
@@ -1,15 +1,39 @@
 from fastapi import Header,status, HTTPException
-from jose import JWTError, jwt
 from typing import Optional
-from config import SECRET_KEY, ALGORITHM
+from config import SECRET_KEY, ALGORITHM, USER_CACHE_SIZE, USER_CACHE_TTL, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 from database import users_collection
 from model.auth import SignUpModel, SignInModel
-from utils.auth import hash_password, verify_password, create_token
+from utils.auth import hash_password_async, verify_and_update_password_async, create_token, PasswordHasherBusy
 from utils.comman import custom_response
 from pymongo.collection import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from utils.cache import TTLCache
+from utils.metrics import instrumented
+from utils import invalidation
+import time
 
+# token -> email for tokens whose signature has already been verified
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+# email -> user document (without password)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
 
+def invalidate_user_cache(email: str):
+    user_cache.pop(email)
+    invalidation.publish("user", email)
+
+
+invalidation.subscribe("user", user_cache.pop, user_cache.clear)
+
+
+def get_auth_cache_stats() -> dict:
+    return {
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats()
+    }
+
+
+@instrumented
 async def signup_service(user: SignUpModel):
     if user.password != user.confirm_password:
         return custom_response(400, "Passwords do not match")
@@ -18,20 +42,40 @@ async def signup_service(user: SignUpModel):
         return custom_response(400,"User already exists")
 
     user_data = user.dict()
-    user_data["password"] = hash_password(user.password)
+    try:
+        user_data["password"] = await hash_password_async(user.password)
+    except PasswordHasherBusy:
+        return custom_response(503, "Server busy, please retry")
     del user_data["confirm_password"]
 
-    await users_collection.insert_one(user_data)
+    try:
+        await users_collection.insert_one(user_data)
+    except DuplicateKeyError:
+        # A concurrent sign-up for the same email won the unique index
+        return custom_response(400, "User already exists")
     return custom_response(201, "User created successfully")
 
+@instrumented
 async def signin_service(credentials: SignInModel):
     user = await users_collection.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user:
+        return custom_response(401, "Invalid credentials")
+
+    try:
+        valid, new_hash = await verify_and_update_password_async(credentials.password, user["password"])
+    except PasswordHasherBusy:
+        return custom_response(503, "Server busy, please retry")
+    if not valid:
         return custom_response(401, "Invalid credentials")
 
+    # Transparently upgrade hashes made with outdated CryptContext settings
+    if new_hash:
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+
     token = create_token({"email": credentials.email})
     return custom_response(200, "Sign in successfully", {"token" : token})
 
+@instrumented
 async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
     if authorization is None or not authorization.startswith("Bearer "):
         raise HTTPException(
@@ -40,6 +84,28 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
         )
 
     token = authorization.split(" ")[1]
+    email = token_cache.get(token)
+    if email is None:
+        email = _decode_token(token)
+
+    user = user_cache.get(email)
+    if user is None:
+        user = await users_collection.find_one({"email": email}, {"password": 0})
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        user["_id"] = str(user["_id"])
+        user_cache.set(email, user)
+
+    # Hand out a copy so callers can't mutate the cached entry
+    return dict(user)
+
+
+def _decode_token(token: str) -> str:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("email")
@@ -54,15 +120,10 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
             detail="Could not validate token"
         )
 
-    user = await users_collection.find_one({"email": email}, {"password": 0})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
-    user["_id"] = str(user["_id"])
-    return user
+    # Never keep a token cached past its own expiry
+    exp = payload.get("exp")
+    token_cache.set(token, email, ttl=exp - time.time() if exp else None)
+    return email
 
 
 async def update_user_profile(
@@ -84,6 +145,8 @@ async def update_user_profile(
         projection={"password": 0}  # Exclude password from the response
     )
 
+    invalidate_user_cache(email)
+
     if not updated_user:
         raise custom_response(
             status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,211 @@
+from fastapi import HTTPException, status
+from bson import ObjectId
+from pymongo import UpdateOne, ReplaceOne, DeleteOne
+from database import balances_collection, transactions_collection, borrower_collection
+from utils.comman import custom_response
+from utils.export import iter_batches
+from utils.metrics import instrumented
+from utils.versions import bump_lender_version
+from config import ACCRUAL_BATCH_SIZE
+from datetime import date
+from typing import Optional
+
+# Rollup documents are keyed "lender:<id>" and "borrower:<id>" so every read is
+# a single _id lookup. Each holds running sums over the transactions in scope
+# plus the same sums broken down by transaction status.
+AMOUNT_FIELDS = {
+    "principal": "adjusted_principal",
+    "interest": "interest_amount",
+    "total": "total_balance",
+    "outstanding": "outstanding_balance",
+}
+# Transactions from before the repayment ledger have nothing repaid
+FALLBACK_FIELDS = {"outstanding_balance": "total_balance"}
+TOLERANCE = 1e-6
+
+
+def lender_key(lender_id: str) -> str:
+    return f"lender:{lender_id}"
+
+def borrower_key(borrower_id: str) -> str:
+    return f"borrower:{borrower_id}"
+
+
+def _amounts(txn: dict, sign: int) -> dict:
+    amounts = {
+        name: sign * (txn.get(field, txn.get(FALLBACK_FIELDS.get(field))) or 0)
+        for name, field in AMOUNT_FIELDS.items()
+    }
+    amounts["count"] = sign
+    return amounts
+
+
+def rollup_deltas(txn: dict, sign: int, lender_id: str) -> dict:
+    """$inc documents, keyed by rollup _id, for adding (sign=1) or removing (sign=-1) txn."""
+    amounts = _amounts(txn, sign)
+    inc = dict(amounts)
+    txn_status = txn.get("status", "active")
+    inc.update({f"by_status.{txn_status}.{name}": value for name, value in amounts.items()})
+    return {
+        lender_key(txn.get("lender_id") or lender_id): inc,
+        borrower_key(txn["borrower_id"]): inc,
+    }
+
+
+def _merge(target: dict, deltas: dict):
+    for key, inc in deltas.items():
+        merged = target.setdefault(key, {})
+        for field, value in inc.items():
+            merged[field] = merged.get(field, 0) + value
+
+
+async def apply_rollup_changes(changes: list[tuple[dict, int]], lender_id: str):
+    """Apply (txn, sign) pairs to the rollups as $inc deltas in one bulk_write."""
+    combined = {}
+    for txn, sign in changes:
+        _merge(combined, rollup_deltas(txn, sign, lender_id))
+    if not combined:
+        return
+
+    requests = []
+    for key, inc in combined.items():
+        scope, scope_id = key.split(":", 1)
+        requests.append(UpdateOne(
+            {"_id": key},
+            {"$inc": inc, "$setOnInsert": {"scope": scope, "scope_id": scope_id, "lender_id": lender_id}},
+            upsert=True
+        ))
+    await balances_collection.bulk_write(requests, ordered=False)
+
+
+def _summary(doc) -> dict:
+    doc = doc or {}
+    summary = {name: doc.get(name, 0) for name in (*AMOUNT_FIELDS, "count")}
+    summary["by_status"] = {
+        txn_status: {name: values.get(name, 0) for name in (*AMOUNT_FIELDS, "count")}
+        for txn_status, values in (doc.get("by_status") or {}).items()
+        if values.get("count", 0)
+    }
+    return summary
+
+
+ACCRUAL_PROJECTION = {
+    "adjusted_principal": 1, "principal_amount": 1, "interest_value": 1, "interest_type": 1,
+    "frequency": 1, "transaction_date": 1, "status": 1, "_id": 0
+}
+
+
+async def accrued_totals(query: dict, as_of: date) -> dict:
+    """Accrued interest and balance as of a date over every transaction matching query."""
+    from utils.accrual import accrue_documents  # numpy is only loaded for as-of queries
+
+    totals = {"as_of": as_of.isoformat(), "accrued_interest": 0.0, "balance": 0.0, "by_status": {}}
+    cursor = transactions_collection.find(query, ACCRUAL_PROJECTION)
+    async for batch in iter_batches(cursor, ACCRUAL_BATCH_SIZE):
+        groups = {}
+        for txn in batch:
+            groups.setdefault(txn.get("status", "active"), []).append(txn)
+        for txn_status, txns in groups.items():
+            accrued, balance = accrue_documents(txns, as_of)
+            bucket = totals["by_status"].setdefault(txn_status, {"accrued_interest": 0.0, "balance": 0.0})
+            bucket["accrued_interest"] += float(accrued.sum())
+            bucket["balance"] += float(balance.sum())
+            totals["accrued_interest"] += float(accrued.sum())
+            totals["balance"] += float(balance.sum())
+    return totals
+
+
+@instrumented
+async def get_lender_summary_service(current_user: dict, as_of: Optional[date] = None):
+    doc = await balances_collection.find_one({"_id": lender_key(current_user["_id"])})
+    summary = _summary(doc)
+    if as_of:
+        summary["accrual"] = await accrued_totals({"lender_id": current_user["_id"]}, as_of)
+    return custom_response(200, "Lender summary fetched", {"data": summary})
+
+
+@instrumented
+async def get_borrower_summary_service(borrower_id: str, current_user: dict, as_of: Optional[date] = None):
+    doc = await balances_collection.find_one({"_id": borrower_key(borrower_id)})
+    if doc is None or doc.get("lender_id") != current_user["_id"]:
+        if not ObjectId.is_valid(borrower_id) or not await borrower_collection.find_one(
+            {"_id": ObjectId(borrower_id), "lender_id": current_user["_id"]}, {"_id": 1}
+        ):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized or borrower not found")
+        doc = None
+    summary = _summary(doc)
+    if as_of:
+        summary["accrual"] = await accrued_totals(
+            {"lender_id": current_user["_id"], "borrower_id": borrower_id}, as_of
+        )
+    return custom_response(200, "Borrower summary fetched", {"data": summary})
+
+
+def _drifted(expected: dict, actual) -> bool:
+    expected, actual = _summary(expected), _summary(actual)
+    for name in (*AMOUNT_FIELDS, "count"):
+        if abs(expected[name] - actual[name]) > TOLERANCE:
+            return True
+    if expected["by_status"].keys() != actual["by_status"].keys():
+        return True
+    return any(
+        abs(values[name] - actual["by_status"][txn_status][name]) > TOLERANCE
+        for txn_status, values in expected["by_status"].items()
+        for name in values
+    )
+
+
+async def rebuild_rollups(lender_id: str = None, fix: bool = True) -> dict:
+    """Recompute rollups from the transactions, report drift and optionally rewrite them."""
+    match = {"lender_id": lender_id} if lender_id else {}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"lender_id": "$lender_id", "borrower_id": "$borrower_id", "status": {"$ifNull": ["$status", "active"]}},
+            **{
+                name: {"$sum": {"$ifNull": [f"${field}", f"${FALLBACK_FIELDS[field]}"]} if field in FALLBACK_FIELDS else f"${field}"}
+                for name, field in AMOUNT_FIELDS.items()
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+    expected = {}
+    async for group in transactions_collection.aggregate(pipeline, allowDiskUse=True):
+        group_lender = group["_id"]["lender_id"]
+        txn_status = group["_id"]["status"]
+        amounts = {name: group[name] for name in (*AMOUNT_FIELDS, "count")}
+        for key in (lender_key(group_lender), borrower_key(group["_id"]["borrower_id"])):
+            doc = expected.setdefault(key, {"lender_id": group_lender, "by_status": {}})
+            bucket = doc["by_status"].setdefault(txn_status, {})
+            for name, value in amounts.items():
+                doc[name] = doc.get(name, 0) + value
+                bucket[name] = bucket.get(name, 0) + value
+
+    drift = []
+    seen = set()
+    owners = {key: doc["lender_id"] for key, doc in expected.items()}
+    async for actual in balances_collection.find(match):
+        seen.add(actual["_id"])
+        owners.setdefault(actual["_id"], actual.get("lender_id"))
+        if _drifted(expected.get(actual["_id"], {}), actual):
+            drift.append(actual["_id"])
+    drift += [key for key in expected if key not in seen]
+
+    if fix and drift:
+        requests = []
+        for key in drift:
+            if key not in expected:
+                # No transactions left in scope
+                requests.append(DeleteOne({"_id": key}))
+                continue
+            scope, scope_id = key.split(":", 1)
+            requests.append(ReplaceOne(
+                {"_id": key},
+                {"scope": scope, "scope_id": scope_id, **expected[key]},
+                upsert=True
+            ))
+        await balances_collection.bulk_write(requests, ordered=False)
+        for drifted_lender_id in {owners[key] for key in drift if owners.get(key)}:
+            await bump_lender_version(drifted_lender_id)
+
+    return {"checked": len(seen | set(expected)), "drifted": drift, "fixed": fix and bool(drift)}
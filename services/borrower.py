@@ -2,40 +2,61 @@ from bson import ObjectId
 from fastapi import status
 from model.borrower import BorrowerModel
 from database import borrower_collection
-from utils.comman import custom_response, convert_dates,custom_pagination_response
-from pymongo import DESCENDING
+from utils.comman import custom_response, convert_dates,custom_pagination_response, encode_cursor, decode_cursor, keyset_filter
+from utils.count import CountMode, count_documents, count_capped
+from utils.search import build_search_fields, search_query, search_score_stage
+from utils.bulk import iter_csv_rows, iter_ndjson_rows
+from utils.projection import parse_fields, build_projection
+from utils.export import EXPORT_MEDIA_TYPES, iter_batches, encode_rows
+from utils.metrics import instrumented
+from utils.versions import bump_lender_version
+from config import BULK_BATCH_SIZE, BULK_MAX_ERRORS, EXPORT_BATCH_SIZE
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 
+# Internal fields (owner, search keys) never leave the service
+INTERNAL_PROJECTION = {"search_keys": 0, "search_tokens": 0, "lender_id": 0}
+# Fields clients may request with ?fields=
+BORROWER_READ_FIELDS = ["_id", *BorrowerModel.__fields__]
+
+def _read_projection(requested, *extra) -> dict:
+    return build_projection(requested, *extra) if requested is not None else dict(INTERNAL_PROJECTION)
+
+def _borrower_document(borrower: BorrowerModel, lender_id: str) -> dict:
+    borrower_data = borrower.dict()
+    borrower_data["dob"] = convert_dates(borrower.dob)
+    borrower_data["lender_id"] = lender_id
+    borrower_data.update(build_search_fields(borrower_data))
+    return borrower_data
+
+@instrumented
 async def add_or_edit_borrower_service(
     borrower: BorrowerModel,
     _id: str = None,
     lender_id: str = None  # Comes from token (current_user["_id"])
 ):
     try:
-        borrower_data = borrower.dict()
-        borrower_data["dob"] = convert_dates(borrower.dob)
-        borrower_data["lender_id"] = lender_id  # Add lender_id to stored data
+        borrower_data = _borrower_document(borrower, lender_id)  # Adds lender_id to stored data
 
         if _id:
-            # Ensure borrower exists and belongs to the lender
-            existing_borrower = await borrower_collection.find_one(
-                {"_id": ObjectId(_id), "lender_id": lender_id}
+            # Filtering on lender_id makes the update its own ownership check
+            result = await borrower_collection.update_one(
+                {"_id": ObjectId(_id), "lender_id": lender_id},
+                {"$set": borrower_data}
             )
-            if not existing_borrower:
+            if result.matched_count == 0:
                 return custom_response(
                     status.HTTP_404_NOT_FOUND,
                     "Borrower not found or access denied"
                 )
-
-            # Update borrower
-            result = await borrower_collection.update_one(
-                {"_id": ObjectId(_id)},
-                {"$set": borrower_data}
-            )
             if result.modified_count == 0:
                 return custom_response(
                     status.HTTP_400_BAD_REQUEST,
                     "No changes made to borrower"
                 )
+            await bump_lender_version(lender_id)
             return custom_response(
                 status.HTTP_200_OK,
                 "Borrower updated successfully"
@@ -43,6 +64,7 @@ async def add_or_edit_borrower_service(
 
         # Insert new borrower (with lender_id)
         await borrower_collection.insert_one(borrower_data)
+        await bump_lender_version(lender_id)
         return custom_response(
             status.HTTP_200_OK,
             "Borrower added successfully"
@@ -54,35 +76,150 @@ async def add_or_edit_borrower_service(
             f"Service error: {str(e)}"
         )
 
+@instrumented
+async def bulk_import_borrowers_service(
+    chunks,  # async iterator of raw body bytes
+    fmt: str,  # "csv" or "ndjson"
+    lender_id: str
+):
+    """Validate and insert a streamed upload in batches, reporting per-row errors."""
+    inserted = 0
+    failed = 0
+    errors = []
+
+    def report(row_number: int, row_errors: list):
+        nonlocal failed
+        failed += 1
+        if len(errors) < BULK_MAX_ERRORS:
+            errors.append({"row": row_number, "errors": row_errors})
+
+    async def flush(batch: list):
+        nonlocal inserted
+        if not batch:
+            return
+        try:
+            result = await borrower_collection.insert_many([doc for _, doc in batch], ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            inserted += e.details.get("nInserted", 0)
+            for write_error in write_errors:
+                report(batch[write_error["index"]][0], [{"field": None, "message": write_error.get("errmsg", "Write failed")}])
+
+    rows = iter_csv_rows(chunks) if fmt == "csv" else iter_ndjson_rows(chunks)
+    batch = []
+    async for row_number, row in rows:
+        if not isinstance(row, dict):
+            report(row_number, [{"field": None, "message": str(row) if isinstance(row, Exception) else "Row must be an object"}])
+            continue
+        try:
+            borrower = BorrowerModel(**row)
+        except ValidationError as e:
+            report(row_number, [{"field": error["loc"][-1] if error["loc"] else None, "message": error["msg"]} for error in e.errors()])
+            continue
+
+        batch.append((row_number, _borrower_document(borrower, lender_id)))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    await flush(batch)
+
+    if inserted:
+        await bump_lender_version(lender_id)
+
+    return custom_response(
+        status.HTTP_200_OK,
+        "Borrower import finished",
+        {"data": {
+            "inserted": inserted,
+            "failed": failed,
+            "errors": errors,
+            "errors_truncated": failed > len(errors)
+        }}
+    )
+
+def export_borrowers_service(lender_id: str, fmt: str = "csv", fields: str = None):
+    """Stream every borrower of the lender without loading them into memory."""
+    try:
+        requested = parse_fields(fields, BORROWER_READ_FIELDS)
+    except ValueError as e:
+        return custom_response(status.HTTP_400_BAD_REQUEST, str(e))
+    cursor = borrower_collection.find(
+        {"lender_id": lender_id},
+        _read_projection(requested)
+    ).sort("_id", DESCENDING)
+    columns = requested or BORROWER_READ_FIELDS
+    return StreamingResponse(
+        encode_rows(iter_batches(cursor, EXPORT_BATCH_SIZE), fmt, columns),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=borrowers.{fmt}"}
+    )
+
+def search_pipeline(query: dict, search: str, keyset: dict = None, skip: int = 0, limit: int = 8, requested=None) -> list:
+    """Borrowers matching `search`, best match first, one row past the page."""
+    return [
+        {"$match": query},
+        search_score_stage(search),
+        {"$match": keyset or {}},
+        {"$sort": {"search_score": DESCENDING, "_id": DESCENDING}},
+        {"$skip": skip},
+        {"$limit": limit + 1},
+        {"$project": _read_projection(requested, "search_score")}
+    ]
+
+@instrumented
 async def get_borrowers_service(
     search : str,
     lender_id: str,
     page: int = 1,
-    limit: int = 8  # Default limit for pagination
+    limit: int = 8,  # Default limit for pagination
+    after: str = None,  # Opaque cursor from a previous page's next_cursor
+    count: CountMode = "exact",
+    fields: str = None  # Comma separated subset of BORROWER_READ_FIELDS
 ):
     try:
+        try:
+            requested = parse_fields(fields, BORROWER_READ_FIELDS)
+        except ValueError as e:
+            return custom_response(status.HTTP_400_BAD_REQUEST, str(e))
+
         query = {"lender_id": lender_id}
         if search:
-            query["$or"] = [
-                {"first_name": {"$regex": search, "$options": "i"}},
-                {"last_name": {"$regex": search, "$options": "i"}},
-                {"email": {"$regex": search, "$options": "i"}}
-            ]
+            query.update(search_query(search))
             
-        skip_value = (page - 1) * limit
+        # Get total count for pagination calculation
+        total_count = await count_documents(borrower_collection, lender_id, query, count)
+
+        # Searches are ranked by match quality, plain listings by newest first
+        sort_field = "search_score" if search else "_id"
+        keyset = {}
+        if after:
+            try:
+                keyset = keyset_filter(decode_cursor(after), sort_field)
+            except ValueError as e:
+                return custom_response(status.HTTP_400_BAD_REQUEST, str(e))
+            skip_value = 0
+        else:
+            skip_value = (page - 1) * limit
         
         # Fetch paginated results
-        cursor = await borrower_collection.find(query).sort("_id", DESCENDING).skip(skip_value).limit(limit).to_list(limit)
+        if search:
+            pipeline = search_pipeline(query, search, keyset, skip_value, limit, requested)
+            cursor = await borrower_collection.aggregate(pipeline).to_list(limit + 1)
+        else:
+            page_query = {"$and": [query, keyset]} if keyset else query
+            cursor = await borrower_collection.find(page_query, _read_projection(requested)).sort("_id", DESCENDING).skip(skip_value).limit(limit + 1).to_list(limit + 1)
+
+        # One extra row tells us whether another page exists without counting
+        has_more = len(cursor) > limit
+        cursor = cursor[:limit]
+        next_cursor = encode_cursor(cursor[-1], sort_field) if has_more else None
 
-        # Get total count for pagination calculation
-        total_count = await borrower_collection.count_documents(query)
-        borrowers = []
         for borrower in cursor:
-            borrower["_id"] = str(borrower["_id"]) 
-            if "lender_id" in borrower:
-                del borrower["lender_id"] 
-            borrowers.append(borrower)
-        pagination_response = custom_pagination_response(page, limit, total_count, cursor)
+            borrower.pop("search_score", None)
+        pagination_response = custom_pagination_response(
+            page, limit, total_count, cursor, next_cursor, has_more, count_capped(count, total_count)
+        )
         return custom_response(
             status.HTTP_200_OK,
             "Borrowers retrieved successfully",
@@ -94,29 +231,22 @@ async def get_borrowers_service(
             f"Service error: {str(e)}"
         )
 
+@instrumented
 async def delete_borrower_service(
     borrower_id: str,
     lender_id: str  # Comes from token (current_user["_id"])
 ):
     try:
-        # Ensure borrower exists and belongs to the lender
-        borrower = await borrower_collection.find_one(
+        # Filtering on lender_id makes the delete its own ownership check
+        result = await borrower_collection.delete_one(
             {"_id": ObjectId(borrower_id), "lender_id": lender_id}
         )
-        if not borrower:
+        if result.deleted_count == 0:
             return custom_response(
                 status.HTTP_404_NOT_FOUND,
                 "Borrower not found or access denied"
             )
-
-        result = await borrower_collection.delete_one(
-            {"_id": ObjectId(borrower_id)}
-        )
-        if result.deleted_count == 0:
-            return custom_response(
-                status.HTTP_400_BAD_REQUEST,
-                "Error deleting borrower"
-            )
+        await bump_lender_version(lender_id)
         return custom_response(
             status.HTTP_200_OK,
             "Borrower deleted successfully"
@@ -127,9 +257,11 @@ async def delete_borrower_service(
             f"Service error: {str(e)}"
         )
     
+@instrumented
 async def get_borrower_details_service(
     borrower_id: str,
-    lender_id: str  # Comes from the current_user["_id"]
+    lender_id: str,  # Comes from the current_user["_id"]
+    fields: str = None  # Comma separated subset of BORROWER_READ_FIELDS
 ):
     try:
         # Validate ObjectId
@@ -139,10 +271,15 @@ async def get_borrower_details_service(
                 "Invalid borrower ID format"
             )
 
+        try:
+            requested = parse_fields(fields, BORROWER_READ_FIELDS)
+        except ValueError as e:
+            return custom_response(status.HTTP_400_BAD_REQUEST, str(e))
+
         # Find borrower who belongs to the current lender
         borrower = await borrower_collection.find_one(
             {"_id": ObjectId(borrower_id), "lender_id": lender_id},
-            {"_id": 1, "name": 1, "email": 1, "phone": 1, "address": 1, "created_at": 1}  # Return only necessary fields
+            _read_projection(requested)  # Return only the requested fields
         )
 
         if not borrower:
@@ -151,9 +288,6 @@ async def get_borrower_details_service(
                 "Borrower not found or access denied"
             )
 
-        # Convert ObjectId to string for response
-        borrower["_id"] = str(borrower["_id"])
-
         return custom_response(
             status.HTTP_200_OK,
             "Borrower details retrieved successfully",
@@ -164,4 +298,32 @@ async def get_borrower_details_service(
         return custom_response(
             status.HTTP_500_INTERNAL_SERVER_ERROR,
             f"Service error: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+async def backfill_search_fields(batch_size: int = 500, rebuild: bool = False) -> int:
+    """
+    Populate search fields on borrowers saved before search indexing existed,
+    or on every borrower with `rebuild` (after a tokenizer change).
+    """
+    updated = 0
+    last_id = None
+    while True:
+        query = {} if rebuild else {"search_tokens": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await borrower_collection.find(
+            query, {"first_name": 1, "last_name": 1, "email": 1, "lender_id": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return updated
+
+        await borrower_collection.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": build_search_fields(doc)}) for doc in batch],
+            ordered=False
+        )
+        # Search results changed, so cached counts and ETags must not survive
+        for lender_id in {doc.get("lender_id") for doc in batch} - {None}:
+            await bump_lender_version(lender_id)
+        updated += len(batch)
+        last_id = batch[-1]["_id"]
@@ -0,0 +1,103 @@
+from datetime import date, datetime
+from database import borrower_collection, transactions_collection
+from utils.cache import TTLCache
+from utils.comman import custom_response
+from utils.metrics import instrumented
+from utils.versions import lender_version
+from config import DASHBOARD_CACHE_SIZE, DASHBOARD_CACHE_TTL, DASHBOARD_MONTHS
+
+# Keyed by lender version like the count cache, so any write by the lender
+# (on any worker) misses straight away, and by date since the months roll over;
+# the TTL only bounds idle entries
+dashboard_cache = TTLCache(maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL)
+
+
+def _months(today: date, count: int) -> list[str]:
+    """The last `count` months up to and including today's, oldest first, as YYYY-MM."""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+def dashboard_pipeline(lender_id: str, months: list[str]) -> list:
+    """Borrower count, status totals and the monthly histogram in one $facet over transactions."""
+    since = datetime.strptime(months[0], "%Y-%m")
+    transactions_only = {"$match": {"_borrower": {"$exists": False}}}
+    return [
+        {"$match": {"lender_id": lender_id}},
+        # Borrowers join the stream as bare markers so the same $facet counts them
+        {"$unionWith": {"coll": borrower_collection.name, "pipeline": [
+            {"$match": {"lender_id": lender_id}},
+            {"$project": {"_id": 0, "_borrower": {"$literal": True}}},
+        ]}},
+        {"$facet": {
+            "borrowers": [
+                {"$match": {"_borrower": True}},
+                {"$count": "count"}
+            ],
+            "by_status": [
+                transactions_only,
+                {"$group": {
+                    "_id": {"$ifNull": ["$status", "active"]},
+                    "count": {"$sum": 1},
+                    "principal": {"$sum": "$adjusted_principal"},
+                    "interest": {"$sum": "$interest_amount"},
+                    "outstanding": {"$sum": {"$ifNull": ["$outstanding_balance", "$total_balance"]}},
+                }}
+            ],
+            "by_month": [
+                transactions_only,
+                {"$match": {"transaction_date": {"$gte": since}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m", "date": "$transaction_date"}},
+                    "count": {"$sum": 1},
+                    "principal": {"$sum": "$adjusted_principal"},
+                }}
+            ],
+        }}
+    ]
+
+
+async def _dashboard_facets(lender_id: str, months: list[str]) -> dict:
+    result = await transactions_collection.aggregate(dashboard_pipeline(lender_id, months)).to_list(1)
+    return result[0] if result else {"borrowers": [], "by_status": [], "by_month": []}
+
+
+@instrumented
+async def get_dashboard_service(current_user: dict):
+    lender_id = current_user["_id"]
+    key = (lender_id, await lender_version(lender_id), date.today())
+    dashboard = dashboard_cache.get(key)
+    if dashboard is not None:
+        return custom_response(200, "Dashboard fetched", {"data": dashboard})
+
+    months = _months(date.today(), DASHBOARD_MONTHS)
+    facets = await _dashboard_facets(lender_id, months)
+
+    by_status = {group["_id"]: group for group in facets["by_status"]}
+    by_month = {group["_id"]: group for group in facets["by_month"]}
+    dashboard = {
+        "borrowers": facets["borrowers"][0]["count"] if facets["borrowers"] else 0,
+        "transactions": {
+            "total": sum(group["count"] for group in by_status.values()),
+            "active": by_status.get("active", {}).get("count", 0),
+            "closed": by_status.get("closed", {}).get("count", 0),
+        },
+        **{
+            name: sum(group[name] or 0 for group in by_status.values())
+            for name in ("principal", "interest", "outstanding")
+        },
+        "by_month": [
+            {
+                "month": month,
+                "count": by_month.get(month, {}).get("count", 0),
+                "principal": by_month.get(month, {}).get("principal", 0),
+            }
+            for month in months
+        ],
+    }
+    dashboard_cache.set(key, dashboard)
+    return custom_response(200, "Dashboard fetched", {"data": dashboard})
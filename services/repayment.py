@@ -0,0 +1,189 @@
+"""
+Repayment ledger.
+
+Every repayment is an entry in the `repayments` collection and is folded into
+its transaction as it is recorded: `repaid_amount` grows by the amount and
+`outstanding_balance` / `status` are re-derived in the same atomic update, so
+reading a balance never sums history. `verify_ledger` replays the ledger to
+check (and optionally repair) those running totals.
+"""
+from fastapi import HTTPException, status
+from bson import ObjectId
+from database import transactions_collection, repayments_collection
+from model.transaction import RepaymentModel
+from utils.comman import custom_response
+from utils.export import iter_batches
+from utils.metrics import instrumented
+from utils.versions import bump_lender_version
+from services.balance import apply_rollup_changes, TOLERANCE
+from services.transaction import SETTLE_STAGES, SETTLED_TOLERANCE, settled
+from pymongo.collection import ReturnDocument
+from config import LEDGER_BATCH_SIZE
+from datetime import datetime, date, timedelta, timezone
+
+LEDGER_FIELDS = ("total_balance", "repaid_amount", "outstanding_balance", "status")
+# Replay skips transactions repaid this recently: a repayment updates the
+# transaction first and writes its ledger entry right after
+IN_FLIGHT_GRACE = timedelta(minutes=1)
+
+
+def _repaid_by(amount: float, now: datetime) -> list:
+    """Update pipeline adding `amount` (negative to reverse) to repaid_amount and re-settling."""
+    return [
+        {"$set": {
+            "repaid_amount": {"$add": [{"$ifNull": ["$repaid_amount", 0]}, amount]},
+            "last_repayment_at": {"$literal": now},
+        }},
+        *SETTLE_STAGES
+    ]
+
+
+@instrumented
+async def add_repayment_service(txn_id: str, repayment: RepaymentModel, current_user: dict):
+    if not ObjectId.is_valid(txn_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    lender_id = current_user["_id"]
+    now = datetime.now(timezone.utc)
+
+    # Only an active transaction owing at least the amount matches, so
+    # concurrent repayments can never overpay it. The ledger entry is written
+    # only once this has succeeded, so a rejected repayment never reaches it.
+    previous = await transactions_collection.find_one_and_update(
+        {
+            "_id": ObjectId(txn_id),
+            "lender_id": lender_id,
+            "status": "active",
+            "$expr": {"$gte": [
+                {"$ifNull": ["$outstanding_balance", "$total_balance"]},
+                repayment.amount - SETTLED_TOLERANCE
+            ]},
+        },
+        _repaid_by(repayment.amount, now),
+        return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+        txn = await transactions_collection.find_one(
+            {"_id": ObjectId(txn_id), "lender_id": lender_id}, {f: 1 for f in LEDGER_FIELDS}
+        )
+        if not txn:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+        if txn.get("status", "active") != "active":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Transaction is already closed")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Amount exceeds outstanding balance of {txn.get('outstanding_balance', txn.get('total_balance'))}"
+        )
+
+    paid_on = repayment.paid_on or date.today()
+    entry = {
+        "transaction_id": txn_id,
+        "lender_id": lender_id,
+        "amount": repayment.amount,
+        "paid_on": datetime.combine(paid_on, datetime.min.time()),
+        "note": repayment.note,
+        "created_at": now,
+    }
+    try:
+        await repayments_collection.insert_one(entry)
+    except Exception:
+        # Undo the balance change. If the process dies before this, the
+        # balance is ahead of the ledger and verify_ledger --fix reverts it.
+        await transactions_collection.update_one({"_id": previous["_id"]}, _repaid_by(-repayment.amount, now))
+        raise
+
+    updated = {**previous, "repaid_amount": (previous.get("repaid_amount") or 0) + repayment.amount}
+    updated.update(settled(updated))
+    await apply_rollup_changes([(previous, -1), (updated, 1)], lender_id)
+    await bump_lender_version(lender_id)
+    return custom_response(201, "Repayment recorded", {
+        "data": {
+            "_id": entry["_id"],
+            "outstanding_balance": updated["outstanding_balance"],
+            "repaid_amount": updated["repaid_amount"],
+            "status": updated["status"]
+        }
+    })
+
+
+@instrumented
+async def list_repayments_service(txn_id: str, current_user: dict):
+    if not ObjectId.is_valid(txn_id) or not await transactions_collection.find_one(
+        {"_id": ObjectId(txn_id), "lender_id": current_user["_id"]}, {"_id": 1}
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    entries = await repayments_collection.find(
+        {"transaction_id": txn_id}, {"transaction_id": 0, "lender_id": 0}
+    ).sort("_id", 1).to_list(None)
+    return custom_response(200, "Repayments fetched", {"data": entries})
+
+
+def _expected(txn: dict, repaid: float) -> dict:
+    expected = {"total_balance": txn.get("total_balance"), "repaid_amount": repaid}
+    expected.update(settled(expected))
+    expected.pop("total_balance")
+    return expected
+
+
+def _ledger_drifted(txn: dict, expected: dict) -> bool:
+    for field, value in expected.items():
+        actual = txn.get(field)
+        if actual is None:
+            return True  # written before the ledger existed
+        if field == "status":
+            if actual != value:
+                return True
+        elif abs(actual - value) > TOLERANCE:
+            return True
+    return False
+
+
+async def verify_ledger(lender_id: str = None, fix: bool = False, batch_size: int = LEDGER_BATCH_SIZE) -> dict:
+    """
+    Replay the ledger against every transaction in batches and report drift
+    between the summed repayments and the stored running totals. With `fix`,
+    rewrite the drifted totals (also backfills transactions created before the
+    ledger) and their rollups.
+    """
+    match = {"lender_id": lender_id} if lender_id else {}
+    projection = {
+        "lender_id": 1, "borrower_id": 1, "adjusted_principal": 1, "interest_amount": 1, "last_repayment_at": 1,
+        **{f: 1 for f in LEDGER_FIELDS}
+    }
+    report = {"checked": 0, "skipped": 0, "drifted": [], "fixed": 0}
+    cursor = transactions_collection.find(match, projection).sort("_id", 1)
+    async for batch in iter_batches(cursor, batch_size):
+        ids = [str(txn["_id"]) for txn in batch]
+        sums = {
+            group["_id"]: group async for group in repayments_collection.aggregate([
+                {"$match": {"transaction_id": {"$in": ids}}},
+                {"$group": {"_id": "$transaction_id", "repaid": {"$sum": "$amount"}}}
+            ])
+        }
+        # Stored datetimes come back naive (UTC)
+        in_flight_after = (datetime.now(timezone.utc) - IN_FLIGHT_GRACE).replace(tzinfo=None)
+        changes = {}
+        for txn in batch:
+            group = sums.get(str(txn["_id"]))
+            repaid_at = txn.get("last_repayment_at")
+            if repaid_at is not None and repaid_at.replace(tzinfo=None) > in_flight_after:
+                report["skipped"] += 1
+                continue
+            report["checked"] += 1
+            expected = _expected(txn, group["repaid"] if group else 0.0)
+            if not _ledger_drifted(txn, expected):
+                continue
+            report["drifted"].append(str(txn["_id"]))
+            if not fix:
+                continue
+            # Conditional on the totals read, so a repayment landing meanwhile wins
+            result = await transactions_collection.update_one(
+                {"_id": txn["_id"], **{f: txn.get(f) for f in ("repaid_amount", "status")}},
+                {"$set": expected}
+            )
+            if result.modified_count:
+                report["fixed"] += 1
+                changes.setdefault(txn["lender_id"], []).extend([(txn, -1), ({**txn, **expected}, 1)])
+        for txn_lender_id, lender_changes in changes.items():
+            await apply_rollup_changes(lender_changes, txn_lender_id)
+            await bump_lender_version(txn_lender_id)
+    return report
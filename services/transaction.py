@@ -1,10 +1,51 @@
+import asyncio
 from fastapi import HTTPException, status
 from bson import ObjectId
-from database import transactions_collection, borrower_collection
-from model.transaction import TransactionModel
-from utils.comman import custom_response, custom_pagination_response
+from database import transactions_collection, borrower_collection, repayments_collection
+from model.transaction import TransactionModel, BulkTransactionModel
+from utils.comman import custom_response, custom_pagination_response, encode_cursor, decode_cursor, keyset_filter
 from datetime import datetime, date
-from utils.comman import serialize_mongo_documents
+from utils.search import search_query
+from utils.count import CountMode, count_cache, count_key, count_capped
+from utils.export import EXPORT_MEDIA_TYPES, iter_batches, encode_rows
+from utils.metrics import instrumented
+from utils.versions import bump_lender_version
+from utils.schedule import iter_schedule, schedule_summary
+from itertools import islice
+from utils.cache import TTLCache
+from config import COUNT_ESTIMATE_CAP, BULK_MAX_OPERATIONS, EXPORT_BATCH_SIZE, EXPORT_NAME_CACHE_SIZE, SCHEDULE_DEFAULT_LIMIT
+from fastapi.responses import StreamingResponse
+from pymongo.collection import ReturnDocument
+from services.balance import apply_rollup_changes, rebuild_rollups
+from typing import Optional
+from utils.projection import parse_fields, build_projection, trim
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+
+# Fields clients may request with ?fields=
+TRANSACTION_READ_FIELDS = [
+    "_id", *TransactionModel.__fields__, "adjusted_principal", "interest_amount", "total_balance",
+    "status", "outstanding_balance", "repaid_amount", "borrower_name", "accrued_interest", "accrued_balance",
+    "next_due_date", "next_due_amount"
+]
+COMPUTED_FIELDS = {"borrower_name", "accrued_interest", "accrued_balance"}
+# What a transaction's rollup deltas are computed from. Bulk updates and deletes
+# only match while these still hold the values the deltas were computed from.
+ROLLUP_SNAPSHOT_FIELDS = (
+    "borrower_id", "status", "adjusted_principal", "interest_amount", "total_balance",
+    "outstanding_balance", "repaid_amount"
+)
+ACCRUAL_INPUTS = ("adjusted_principal", "principal_amount", "interest_value", "interest_type", "frequency", "transaction_date")
+
+# A transaction closes once its outstanding balance is within half a cent of zero
+SETTLED_TOLERANCE = 0.005
+# Update-pipeline stages that derive outstanding_balance and status from the
+# document's own total_balance and repaid_amount, so they stay right even when
+# a repayment lands concurrently. Documents from before the ledger count as unpaid.
+SETTLE_STAGES = [
+    {"$set": {"outstanding_balance": {"$subtract": ["$total_balance", {"$ifNull": ["$repaid_amount", 0]}]}}},
+    {"$set": {"status": {"$cond": [{"$lte": ["$outstanding_balance", SETTLED_TOLERANCE]}, "closed", "active"]}}},
+]
 
 def calculate_transaction_fields(txn: dict):
     principal = txn["principal_amount"]
@@ -17,6 +58,31 @@ def calculate_transaction_fields(txn: dict):
         "total_balance": total
     }
 
+def prepare_transaction(txn_data: TransactionModel) -> dict:
+    txn_dict = txn_data.dict()
+    if isinstance(txn_dict.get('transaction_date'), date):
+        txn_dict['transaction_date'] = datetime.combine(txn_dict['transaction_date'], datetime.min.time())
+    txn_dict.update(calculate_transaction_fields(txn_dict))
+    txn_dict.update(schedule_summary(txn_dict))
+    return txn_dict
+
+def settled(txn: dict) -> dict:
+    """What SETTLE_STAGES writes, computed locally for rollup deltas."""
+    outstanding = (txn.get("total_balance") or 0) - (txn.get("repaid_amount") or 0)
+    return {"outstanding_balance": outstanding, "status": "closed" if outstanding <= SETTLED_TOLERANCE else "active"}
+
+def new_transaction_fields(txn_dict: dict, lender_id: str) -> dict:
+    return {
+        "status": "active",
+        "lender_id": lender_id,
+        "outstanding_balance": txn_dict["total_balance"],
+        "repaid_amount": 0.0
+    }
+
+def _update_pipeline(txn_dict: dict) -> list:
+    # $literal keeps user text such as a note starting with "$" from being read as a field path
+    return [{"$set": {field: {"$literal": value} for field, value in txn_dict.items()}}, *SETTLE_STAGES]
+
 async def verify_borrower_ownership(borrower_id: str, lender_id: str):
     borrower = await borrower_collection.find_one({
         "_id": ObjectId(borrower_id),
@@ -26,89 +92,475 @@ async def verify_borrower_ownership(borrower_id: str, lender_id: str):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized or borrower not found")
     return borrower
 
+async def _after_write(changes: list[tuple[dict, int]], lender_id: str, *writes):
+    """
+    Apply the rollup deltas, bump the lender version and run any other
+    follow-up writes as one concurrent round trip. Nothing tagged with the
+    version reads the rollups, so the bump needn't wait for them; it must
+    only come after the transaction write itself.
+    """
+    await asyncio.gather(apply_rollup_changes(changes, lender_id), bump_lender_version(lender_id), *writes)
+
+@instrumented
 async def add_transaction_service(txn_data: TransactionModel, current_user: dict):
     await verify_borrower_ownership(txn_data.borrower_id, current_user["_id"])
 
-    txn_dict = txn_data.dict()
-    txn_dict.update(calculate_transaction_fields(txn_dict))
-    txn_dict.update({
-        "status": "active",
-        "lender_id": current_user["_id"]
-    })
-    if isinstance(txn_dict.get('transaction_date'), date):
-        txn_dict['transaction_date'] = datetime.combine(txn_dict['transaction_date'], datetime.min.time())
+    txn_dict = prepare_transaction(txn_data)
+    txn_dict.update(new_transaction_fields(txn_dict, current_user["_id"]))
 
     await transactions_collection.insert_one(txn_dict)
+    await _after_write([(txn_dict, 1)], current_user["_id"])
     return custom_response(201, "Transaction added")
 
+@instrumented
 async def update_transaction_service(txn_id: str, txn_data: TransactionModel, current_user: dict):
-    txn = await transactions_collection.find_one({"_id": ObjectId(txn_id)})
-    if not txn:
+    txn_dict = prepare_transaction(txn_data)
+
+    # The lender_id/borrower_id filter is the ownership check, so the common
+    # case is one round trip. BEFORE gives the exact state replaced for the
+    # rollup delta.
+    previous = await transactions_collection.find_one_and_update(
+        {"_id": ObjectId(txn_id), "lender_id": current_user["_id"], "borrower_id": txn_data.borrower_id},
+        _update_pipeline(txn_dict),
+        return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+        # Either it doesn't exist/belong to the lender or it's moving to another borrower
+        await verify_borrower_ownership(txn_data.borrower_id, current_user["_id"])
+        previous = await transactions_collection.find_one_and_update(
+            {"_id": ObjectId(txn_id), "lender_id": current_user["_id"]},
+            _update_pipeline(txn_dict),
+            return_document=ReturnDocument.BEFORE
+        )
+    if not previous:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
 
-    await verify_borrower_ownership(txn["borrower_id"], current_user["_id"])
+    updated = {**previous, **txn_dict}
+    updated.update(settled(updated))
+    await _after_write([(previous, -1), (updated, 1)], current_user["_id"])
+    return custom_response(200, "Transaction updated")
 
-    txn_dict = txn_data.dict()
-    if isinstance(txn_dict.get('transaction_date'), date):
-        txn_dict['transaction_date'] = datetime.combine(txn_dict['transaction_date'], datetime.min.time())
+@instrumented
+async def delete_transaction_service(txn_id: str, current_user: dict):
+    deleted = await transactions_collection.find_one_and_delete(
+        {"_id": ObjectId(txn_id), "lender_id": current_user["_id"]}
+    )
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Transaction not found")
 
-    txn_dict.update(calculate_transaction_fields(txn_dict))
+    await _after_write(
+        [(deleted, -1)], current_user["_id"], repayments_collection.delete_many({"transaction_id": txn_id})
+    )
+    return custom_response(200, "Transaction deleted")
 
-    await transactions_collection.update_one(
-        {"_id": ObjectId(txn_id)},
-        {"$set": txn_dict}
+@instrumented
+async def bulk_transactions_service(payload: BulkTransactionModel, current_user: dict):
+    """Apply a batch of mixed create/update/delete operations with one ownership check and one bulk_write."""
+    lender_id = current_user["_id"]
+    operations = payload.operations
+    if len(operations) > BULK_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_MAX_OPERATIONS} operations per batch"
+        )
+
+    results = [{"index": i, "op": item.op, "status": "ok"} for i, item in enumerate(operations)]
+
+    def fail(i: int, error: str):
+        results[i].update({"status": "error", "error": error})
+
+    # Shape checks. An unordered bulk_write gives no order between two
+    # operations on the same transaction, so only the first one is accepted.
+    claimed = set()
+    for i, item in enumerate(operations):
+        if item.op in ("create", "update") and item.data is None:
+            fail(i, "data is required")
+        elif item.op in ("update", "delete") and not (item.txn_id and ObjectId.is_valid(item.txn_id)):
+            fail(i, "valid txn_id is required")
+        elif item.data is not None and not ObjectId.is_valid(item.data.borrower_id):
+            fail(i, "Invalid borrower_id")
+        elif item.op != "create" and item.txn_id in claimed:
+            fail(i, "txn_id already used by an earlier operation in this batch")
+        elif item.op != "create":
+            claimed.add(item.txn_id)
+
+    pending = [i for i, r in enumerate(results) if r["status"] == "ok"]
+
+    # One query verifies every referenced borrower belongs to the lender
+    borrower_ids = {operations[i].data.borrower_id for i in pending if operations[i].data is not None}
+    owned = set()
+    if borrower_ids:
+        owned = {
+            str(b["_id"]) for b in await borrower_collection.find(
+                {"_id": {"$in": [ObjectId(b) for b in borrower_ids]}, "lender_id": lender_id},
+                {"_id": 1}
+            ).to_list(None)
+        }
+
+    # One query finds which of the referenced transactions the lender owns,
+    # along with the amounts their rollups currently include
+    txn_ids = {operations[i].txn_id for i in pending if operations[i].txn_id}
+    existing = {}
+    if txn_ids:
+        existing = {
+            str(t["_id"]): t for t in await transactions_collection.find(
+                {"_id": {"$in": [ObjectId(t) for t in txn_ids]}, "lender_id": lender_id},
+                {"lender_id": 1, **{field: 1 for field in ROLLUP_SNAPSHOT_FIELDS}}
+            ).to_list(None)
+        }
+
+    def unchanged(txn_id: str) -> dict:
+        # A field missing from the snapshot matches null/missing, as on legacy documents
+        snapshot = existing[txn_id]
+        return {
+            "_id": ObjectId(txn_id), "lender_id": lender_id,
+            **{field: snapshot.get(field) for field in ROLLUP_SNAPSHOT_FIELDS}
+        }
+
+    # expected_state: the fields an update sets, or None for a delete
+    requests, request_index, rollup_changes, expected_state = [], [], [], {}
+    for i in pending:
+        item = operations[i]
+        if item.data is not None and item.data.borrower_id not in owned:
+            fail(i, "Unauthorized or borrower not found")
+            continue
+        if item.txn_id and item.txn_id not in existing:
+            fail(i, "Transaction not found")
+            continue
+
+        if item.op == "create":
+            txn_dict = prepare_transaction(item.data)
+            txn_dict.update({"_id": ObjectId(), **new_transaction_fields(txn_dict, lender_id)})
+            results[i]["txn_id"] = str(txn_dict["_id"])
+            requests.append(InsertOne(txn_dict))
+            rollup_changes.append([(txn_dict, 1)])
+        elif item.op == "update":
+            results[i]["txn_id"] = item.txn_id
+            txn_dict = prepare_transaction(item.data)
+            requests.append(UpdateOne(unchanged(item.txn_id), _update_pipeline(txn_dict)))
+            expected_state[i] = txn_dict
+            previous = existing[item.txn_id]
+            updated = {**previous, **txn_dict}
+            updated.update(settled(updated))
+            rollup_changes.append([(previous, -1), (updated, 1)])
+        else:
+            results[i]["txn_id"] = item.txn_id
+            requests.append(DeleteOne(unchanged(item.txn_id)))
+            expected_state[i] = None
+            rollup_changes.append([(existing[item.txn_id], -1)])
+        request_index.append(i)
+
+    if requests:
+        try:
+            outcome = (await transactions_collection.bulk_write(requests, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            outcome = e.details
+            for write_error in outcome.get("writeErrors", []):
+                fail(request_index[write_error["index"]], write_error.get("errmsg", "Write failed"))
+
+        matched = outcome["nMatched"] + outcome["nRemoved"]
+        changed = [i for i in expected_state if results[i]["status"] == "ok"]
+        exact = matched == len(changed)
+        if not exact:
+            # Some update/delete matched nothing: its transaction was deleted or
+            # changed after the snapshot. The result has no per-operation match
+            # flags, so tell which from the transactions' current state.
+            current = {
+                str(t["_id"]): t for t in await transactions_collection.find(
+                    {"_id": {"$in": [ObjectId(operations[i].txn_id) for i in changed]}}
+                ).to_list(None)
+            }
+            for i in changed:
+                doc, state = current.get(operations[i].txn_id), expected_state[i]
+                if state is not None and doc is None:
+                    fail(i, "Transaction not found")
+                elif state is None and doc is not None or state is not None and any(
+                    doc.get(field) != value for field, value in state.items()
+                ):
+                    fail(i, "Transaction was modified concurrently, retry")
+            # Still ambiguous if another request deleted or rewrote the same
+            # transactions identically; recount the rollups rather than guess
+            exact = matched == sum(1 for i in changed if results[i]["status"] == "ok")
+
+        if exact:
+            await apply_rollup_changes([
+                change
+                for n, i in enumerate(request_index) if results[i]["status"] == "ok"
+                for change in rollup_changes[n]
+            ], lender_id)
+        else:
+            await rebuild_rollups(lender_id)
+        deleted_ids = [operations[i].txn_id for i in request_index if operations[i].op == "delete" and results[i]["status"] == "ok"]
+        if deleted_ids:
+            await repayments_collection.delete_many({"transaction_id": {"$in": deleted_ids}})
+        await bump_lender_version(lender_id)
+
+    succeeded = sum(1 for r in results if r["status"] == "ok")
+    return custom_response(200, "Bulk transactions processed", {
+        "data": {
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results
+        }
+    })
+
+EXPORT_COLUMNS = [
+    "_id", "borrower_id", "borrower_name", "principal_amount", "interest_type", "interest_value",
+    "frequency", "transaction_date", "note", "adjusted_principal", "interest_amount", "total_balance",
+    "outstanding_balance", "repaid_amount", "status"
+]
+
+async def _with_borrower_names(batches, lender_id: str):
+    # Names are resolved per batch with one $in query for the ids not already cached
+    names = TTLCache(maxsize=EXPORT_NAME_CACHE_SIZE, ttl=float("inf"))
+    async for batch in batches:
+        missing = {txn["borrower_id"] for txn in batch if names.get(txn["borrower_id"]) is None}
+        valid = [ObjectId(b) for b in missing if ObjectId.is_valid(b)]
+        if valid:
+            async for b in borrower_collection.find(
+                {"_id": {"$in": valid}, "lender_id": lender_id},
+                {"first_name": 1, "last_name": 1}
+            ):
+                names.set(str(b["_id"]), f"{b.get('first_name', '')} {b.get('last_name', '')}".strip())
+        for txn in batch:
+            txn["borrower_name"] = names.get(txn["borrower_id"]) or "N/A"
+        yield batch
+
+def export_query(lender_id: str, borrower_id: str = "", status: str = "") -> dict:
+    query = {"lender_id": lender_id}
+    if borrower_id:
+        query["borrower_id"] = borrower_id
+    if status:
+        query["status"] = status
+    return query
+
+def export_transactions_service(current_user: dict, fmt: str = "csv", borrower_id: str = "", status: str = "", fields: Optional[str] = None):
+    """Stream the lender's transactions in batches with borrower names joined."""
+    try:
+        requested = parse_fields(fields, EXPORT_COLUMNS)
+    except ValueError as e:
+        return custom_response(400, str(e))
+    lender_id = current_user["_id"]
+    query = export_query(lender_id, borrower_id, status)
+
+    columns = requested or EXPORT_COLUMNS
+    if requested is None:
+        projection = {"lender_id": 0}
+    else:
+        projection = build_projection([c for c in requested if c != "borrower_name"], "borrower_id")
+    cursor = transactions_collection.find(query, projection).sort("_id", -1)
+    batches = iter_batches(cursor, EXPORT_BATCH_SIZE)
+    if "borrower_name" in columns:
+        batches = _with_borrower_names(batches, lender_id)
+    return StreamingResponse(
+        encode_rows(batches, fmt, columns),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=transactions.{fmt}"}
     )
-    return custom_response(200, "Transaction updated")
 
-async def delete_transaction_service(txn_id: str, current_user: dict):
-    txn = await transactions_collection.find_one({"_id": ObjectId(txn_id)})
-    if not txn:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+def _borrower_lookup_stages():
+    # transactions store borrower_id as a string, borrowers use ObjectId _id
+    return [
+        {"$addFields": {"borrower_oid": {"$toObjectId": "$borrower_id"}}},
+        {"$lookup": {
+            "from": borrower_collection.name,
+            "localField": "borrower_oid",
+            "foreignField": "_id",
+            "as": "borrower"
+        }}
+    ]
 
-    await verify_borrower_ownership(txn["borrower_id"], current_user["_id"])
+def _search_stages(query: dict, search: str) -> list:
+    # Resolve the search on the borrower side, through the (lender_id,
+    # search_tokens) index, and join only the matching borrowers' transactions
+    # (served by borrower_id indexes) so the cost follows the matches rather
+    # than the lender's whole book
+    borrower_match = {"lender_id": query["lender_id"], **search_query(search)}
+    if "borrower_id" in query:
+        borrower_match["_id"] = ObjectId(query["borrower_id"])
+    return [
+        {"$match": borrower_match},
+        {"$project": {"_id": 0, "borrower_id": {"$toString": "$_id"}}},
+        {"$lookup": {
+            "from": transactions_collection.name,
+            "localField": "borrower_id",
+            "foreignField": "borrower_id",
+            "as": "txn"
+        }},
+        {"$unwind": "$txn"},
+        {"$replaceRoot": {"newRoot": "$txn"}},
+    ]
 
-    await transactions_collection.delete_one({"_id": ObjectId(txn_id)})
-    return custom_response(200, "Transaction deleted")
+def list_pipeline(query: dict, sort_by: str, search: str = "", keyset: Optional[dict] = None, skip: int = 0,
+                  limit: int = 8, count_stages: Optional[list] = None, project_stage: Optional[dict] = None,
+                  want_names: bool = True) -> tuple:
+    """
+    The transaction list aggregation and the collection it runs on; with
+    count_stages it also counts, in the same round trip.
+    """
+    keyset = keyset or {}
+    collection, search_stages = transactions_collection, []
+    if search:
+        collection, search_stages = borrower_collection, _search_stages(query, search)
+
+    # Fetch one extra row so has_more is known without counting, and join
+    # borrower names only for the rows on the page.
+    page_stages = [{"$skip": skip}, {"$limit": limit + 1}]
+    if want_names:
+        page_stages += _borrower_lookup_stages()
+    page_stages.append(project_stage or {"$project": {"lender_id": 0, "borrower_oid": 0}})
+    sort_stage = {"$sort": {sort_by: -1, "_id": -1}}
+
+    if count_stages:
+        # Filter, sort, count and page in a single round trip
+        return collection, [
+            *search_stages,
+            {"$match": query},
+            sort_stage,
+            {"$facet": {
+                "total": count_stages,
+                "docs": [{"$match": keyset}] + page_stages
+            }}
+        ]
+    # Without a count the cursor filter can be served by the index directly
+    page_query = {"$and": [query, keyset]} if keyset else query
+    return collection, [*search_stages, {"$match": page_query}, sort_stage] + page_stages
 
-async def list_transactions_service(page: int, limit: int,search : str,borrower_id :str, status: str, sort_by: str, current_user: dict):
+@instrumented
+async def list_transactions_service(page: int, limit: int,search : str,borrower_id :str, status: str, sort_by: str, current_user: dict, after: str = None, count: CountMode = "exact", as_of: Optional[date] = None, fields: Optional[str] = None):
     skip = (page - 1) * limit
-    query = {}
+    lender_id = current_user["_id"]
+    query = {"lender_id": lender_id}
+
+    try:
+        requested = parse_fields(fields, TRANSACTION_READ_FIELDS)
+    except ValueError as e:
+        return custom_response(400, str(e))
+    want_names = requested is None or "borrower_name" in requested
+    want_due = requested is None or "next_due_date" in requested or "next_due_amount" in requested
 
-    borrower_filter = {"lender_id": current_user["_id"]}
     if borrower_id:
         try:
-            borrower_filter["_id"] = ObjectId(borrower_id)
+            ObjectId(borrower_id)
         except Exception as e:
             return custom_response(
                 404,
                 f"Error while adding borrower: {str(e)}"
             )
-    if search:
-            borrower_filter["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"last_name": {"$regex": search, "$options": "i"}},
-                {"email": {"$regex": search, "$options": "i"}}
-            ]
-
-    borrowers = await borrower_collection.find(borrower_filter).to_list(None)
-    borrower_ids = [str(b["_id"]) for b in borrowers]
-
-    query["borrower_id"] = {"$in": borrower_ids}
+        query["borrower_id"] = borrower_id
     if status:
         query["status"] = status
 
-    total_count = await transactions_collection.count_documents(query)
-    txns = await transactions_collection.find(query).sort(sort_by, -1).skip(skip).limit(limit).to_list(length=limit)
+    keyset = {}
+    if after:
+        try:
+            keyset = keyset_filter(decode_cursor(after), sort_by)
+        except ValueError as e:
+            return custom_response(400, str(e))
+        skip = 0
+
+    count_query = {**query, "search": search_query(search)} if search else query
+
+    total_count = None
+    count_stages = None
+    if count == "exact":
+        cache_key = await count_key(transactions_collection.name, lender_id, count_query)
+        total_count = count_cache.get(cache_key)
+        if total_count is None:
+            count_stages = [{"$count": "count"}]
+    elif count == "estimated":
+        count_stages = [{"$limit": COUNT_ESTIMATE_CAP}, {"$count": "count"}]
 
-    borrower_map = {str(b["_id"]): f"{b.get('first_name', '')} {b.get('last_name', '')}".strip() for b in borrowers}
+    # Only the requested columns (plus what the cursor and accrual need) leave the database
+    project_stage = None
+    if requested is not None:
+        extra = [sort_by]
+        if want_names:
+            extra += ["borrower.first_name", "borrower.last_name"]
+        if as_of or want_due:
+            extra += ACCRUAL_INPUTS
+        project_stage = {"$project": build_projection([f for f in requested if f not in COMPUTED_FIELDS], *extra)}
+
+    collection, pipeline = list_pipeline(
+        query, sort_by, search, keyset, skip, limit, count_stages, project_stage, want_names
+    )
+    if count_stages:
+        result = await collection.aggregate(pipeline).to_list(1)
+        facet = result[0] if result else {"total": [], "docs": []}
+        total_count = facet["total"][0]["count"] if facet["total"] else 0
+        txns = facet["docs"]
+        if count == "exact":
+            count_cache.set(cache_key, total_count)
+    else:
+        txns = await collection.aggregate(pipeline).to_list(limit + 1)
+
+    has_more = len(txns) > limit
+    txns = txns[:limit]
+    next_cursor = encode_cursor(txns[-1], sort_by) if has_more else None
+
+    if as_of:
+        from utils.accrual import accrue_documents  # numpy is only loaded for as-of queries
+        accrued, balance = accrue_documents(txns, as_of)
+        for txn, txn_accrued, txn_balance in zip(txns, accrued.tolist(), balance.tolist()):
+            txn["accrued_interest"] = txn_accrued
+            txn["accrued_balance"] = txn_balance
+
+    if want_due:
+        # The stored summary goes stale once its due date passes; moving it
+        # forward is O(1) and never expands the schedule
+        today = date.today()
+        for txn in txns:
+            due = txn.get("next_due_date")
+            if "next_due_date" not in txn or (due is not None and due.date() < today):
+                txn.update(schedule_summary(txn, today))
 
     for txn in txns:
-        txn["borrower_name"] = borrower_map.get(txn["borrower_id"], "N/A")
-        if "lender_id" in txn:
-            del txn["lender_id"]
-    
-    txns = serialize_mongo_documents(txns)
+        borrower = txn.pop("borrower", None)
+        if not want_names:
+            continue
+        if borrower:
+            txn["borrower_name"] = f"{borrower[0].get('first_name', '')} {borrower[0].get('last_name', '')}".strip()
+        else:
+            txn["borrower_name"] = "N/A"
+    txns = [trim(txn, requested) for txn in txns]
 
     return custom_response(200, "Transaction list fetched", {
-        "data": custom_pagination_response(page, limit, total_count, txns)
+        "data": custom_pagination_response(
+            page, limit, total_count, txns, next_cursor, has_more, count_capped(count, total_count)
+        )
     })
+
+SCHEDULE_COLUMNS = ["period", "due_date", "interest", "accrued_interest", "balance"]
+
+async def _schedule_batches(entries, batch_size: int):
+    while batch := list(islice(entries, batch_size)):
+        yield batch
+
+@instrumented
+async def get_schedule_service(txn_id: str, current_user: dict, start: Optional[date] = None, end: Optional[date] = None, limit: Optional[int] = None, fmt: str = "ndjson"):
+    """Stream the transaction's schedule entries due within [start, end], generated as they are sent."""
+    if not ObjectId.is_valid(txn_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    if start and end and start > end:
+        return custom_response(400, "from must not be after to")
+
+    txn = await transactions_collection.find_one(
+        {"_id": ObjectId(txn_id), "lender_id": current_user["_id"]},
+        build_projection(ACCRUAL_INPUTS, "next_due_date", "next_due_amount")
+    )
+    if not txn:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+
+    # Refresh the stored summary while its inputs are at hand
+    summary = schedule_summary(txn)
+    if any(txn.get(field) != value for field, value in summary.items()):
+        await transactions_collection.update_one({"_id": txn["_id"]}, {"$set": summary})
+
+    entries = iter_schedule(txn, start, end)
+    if limit is not None or end is None:
+        # Schedules are open ended, so an unbounded request gets a default page
+        entries = islice(entries, limit or SCHEDULE_DEFAULT_LIMIT)
+    return StreamingResponse(
+        encode_rows(_schedule_batches(entries, EXPORT_BATCH_SIZE), fmt, SCHEDULE_COLUMNS),
+        media_type=EXPORT_MEDIA_TYPES[fmt]
+    )
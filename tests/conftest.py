@@ -0,0 +1,156 @@
+"""
+Runs the app in-process against the mongomock-motor stand-in from
+benchmarks/load.py and records every collection call it makes.
+
+    python -m pytest tests    # needs pytest, httpx and mongomock-motor
+"""
+import asyncio
+import inspect
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings are read at import time, so they must be in place before the app is imported
+os.environ.setdefault("DB_NAME", "loan_test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.update({"ENSURE_INDEXES": "false", "MONGO_WARM_UP": "false", "INVALIDATION_BUS": "false"})
+sys.path.insert(0, ROOT)
+
+from benchmarks.load import use_memory_database  # noqa: E402
+
+use_memory_database()
+
+import database  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from main import app  # noqa: E402
+
+OPERATIONS = {
+    "find", "find_one", "find_one_and_update", "find_one_and_delete", "find_one_and_replace",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "bulk_write", "aggregate", "count_documents",
+}
+
+
+class Calls(list):
+    """
+    (collection, method, filter) for every collection call, in the order
+    they were made, plus how many of them had to wait on one another.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._depths = []  # round trip each recorded call started in
+        self._finished = []  # depths of the calls that have completed
+
+    def start(self, call: tuple) -> int:
+        self.append(call)
+        # A call started before any other finished shares that call's round trip
+        self._depths.append(1 + max(self._finished, default=0))
+        return self._depths[-1]
+
+    def finish(self, depth: int):
+        self._finished.append(depth)
+
+    def clear(self):
+        super().clear()
+        self._depths.clear()
+        self._finished.clear()
+
+    @property
+    def round_trips(self) -> int:
+        """Sequential round trips: calls issued concurrently count once."""
+        return max(self._depths, default=0)
+
+    def on(self, collection: str) -> list[tuple]:
+        """(method, filter) for each call made on `collection`, in order."""
+        return [(method, query) for name, method, query in self if name == collection]
+
+    def methods(self) -> list[str]:
+        return sorted(f"{name}.{method}" for name, method, _ in self)
+
+
+class RecordingCollection:
+    """Forwards to a collection and records every operation in `calls`."""
+
+    def __init__(self, collection, calls: Calls):
+        self._collection = collection
+        self._calls = calls
+
+    def __getattr__(self, attr):
+        value = getattr(self._collection, attr)
+        if attr not in OPERATIONS:
+            return value
+
+        def record(*args, **kwargs):
+            depth = self._calls.start((self._collection.name, attr, args[0] if args else kwargs.get("filter")))
+            result = value(*args, **kwargs)
+            if not inspect.isawaitable(result):
+                self._calls.finish(depth)
+                return result
+
+            async def complete():
+                # mongomock answers without suspending; yield like a network
+                # round trip would so concurrently issued calls start first
+                await asyncio.sleep(0)
+                try:
+                    return await result
+                finally:
+                    self._calls.finish(depth)
+            return complete()
+        return record
+
+
+class RecordingDatabase:
+    def __init__(self, db, calls: Calls):
+        self._db = db
+        self._calls = calls
+
+    def __getitem__(self, name):
+        return RecordingCollection(self._db[name], self._calls)
+
+    def __getattr__(self, attr):
+        return getattr(self._db, attr)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _sign_up(client, email: str) -> dict:
+    payload = {
+        "first_name": "Test", "last_name": "Lender", "email": email,
+        "phone": "9000000000", "password": "test-password", "confirm_password": "test-password",
+    }
+    client.post("/api/auth/signup", json=payload)
+    token = client.post(
+        "/api/auth/signin", json={"email": payload["email"], "password": payload["password"]}
+    ).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # Resolve the lender once so the auth cache keeps user lookups out of the recordings
+    lender_id = client.get("/api/auth/profile", headers=headers).json()["_id"]
+    return {"_id": lender_id, "headers": headers}
+
+
+@pytest.fixture(scope="session")
+def lender(client):
+    return _sign_up(client, "lender@test.example.com")
+
+
+@pytest.fixture(scope="session")
+def other_lender(client):
+    return _sign_up(client, "other-lender@test.example.com")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Every collection call made while the test runs."""
+    recorded = Calls()
+    db = database.get_database()
+    monkeypatch.setattr(database, "get_database", lambda: RecordingDatabase(db, recorded))
+    return recorded
@@ -0,0 +1,125 @@
+"""
+Each ownership-checked write is a single conditional call filtered by `_id`
+and `lender_id`: no separate find, and no borrower lookup for the lender.
+Its follow-ups (rollups, lender version, repayments) go out together in one
+more round trip.
+"""
+from bson import ObjectId
+
+
+def _borrower(client, lender) -> str:
+    payload = {
+        "first_name": "Asha", "last_name": "Patel", "email": f"{ObjectId()}@test.example.com",
+        "dob": "1990-01-01", "address": "1 Market Street", "country": "India", "state": "MH",
+        "pincode": "411001", "phone": "9000000001", "city": "Pune",
+    }
+    assert client.post("/api/borrower/", headers=lender["headers"], json=payload).json()["status"] == 200
+    docs = client.get("/api/borrower/?limit=1&count=false", headers=lender["headers"]).json()["data"]["docs"]
+    return docs[0]["_id"]
+
+
+def _transaction(client, lender, borrower_id: str) -> str:
+    payload = {
+        "borrower_id": borrower_id, "principal_amount": 1000.0, "interest_type": "flat",
+        "interest_value": 50.0, "transaction_date": "2024-01-15",
+    }
+    assert client.post("/api/transaction/", headers=lender["headers"], json=payload).status_code == 201
+    docs = client.get(
+        f"/api/transaction/?limit=1&count=false&borrower_id={borrower_id}", headers=lender["headers"]
+    ).json()["data"]["docs"]
+    return docs[0]["_id"]
+
+
+def _is_conditional(query: dict, _id: str, lender) -> bool:
+    return query["_id"] == ObjectId(_id) and query["lender_id"] == lender["_id"]
+
+
+def test_update_transaction_is_one_write_then_its_follow_ups(client, lender, calls):
+    borrower_id = _borrower(client, lender)
+    txn_id = _transaction(client, lender, borrower_id)
+    calls.clear()
+
+    response = client.put(f"/api/transaction/{txn_id}", headers=lender["headers"], json={
+        "borrower_id": borrower_id, "principal_amount": 2000.0, "interest_type": "flat",
+        "interest_value": 80.0, "transaction_date": "2024-01-15",
+    })
+
+    assert response.status_code == 200
+    assert calls.methods() == [
+        "balances.bulk_write", "transactions.find_one_and_update", "versions.find_one_and_update"
+    ]
+    assert calls.round_trips == 2
+    [(_, query)] = calls.on("transactions")
+    assert _is_conditional(query, txn_id, lender)
+
+
+def test_delete_transaction_is_one_write_then_its_follow_ups(client, lender, calls):
+    txn_id = _transaction(client, lender, _borrower(client, lender))
+    calls.clear()
+
+    response = client.delete(f"/api/transaction/{txn_id}", headers=lender["headers"])
+
+    assert response.status_code == 200
+    assert calls.methods() == [
+        "balances.bulk_write", "repayments.delete_many", "transactions.find_one_and_delete",
+        "versions.find_one_and_update"
+    ]
+    assert calls.round_trips == 2
+    [(_, query)] = calls.on("transactions")
+    assert _is_conditional(query, txn_id, lender)
+
+
+def test_delete_missing_transaction_is_one_round_trip(client, lender, calls):
+    txn_id = str(ObjectId())
+
+    response = client.delete(f"/api/transaction/{txn_id}", headers=lender["headers"])
+
+    assert response.status_code == 404
+    assert calls.methods() == ["transactions.find_one_and_delete"]
+    [(_, query)] = calls.on("transactions")
+    assert _is_conditional(query, txn_id, lender)
+
+
+def test_edit_borrower_is_one_conditional_write(client, lender, calls):
+    borrower_id = _borrower(client, lender)
+    calls.clear()
+
+    response = client.post(f"/api/borrower/?borrower_id={borrower_id}", headers=lender["headers"], json={
+        "first_name": "Ravi", "last_name": "Patel", "email": f"{ObjectId()}@test.example.com",
+        "dob": "1990-01-01", "address": "2 Market Street", "country": "India", "state": "MH",
+        "pincode": "411001", "phone": "9000000001", "city": "Pune",
+    })
+
+    assert response.json()["status"] == 200
+    # The version bump has to follow the write: bumped first, a concurrent
+    # read could cache the old borrower under the new version
+    assert calls.methods() == ["borrower.update_one", "versions.find_one_and_update"]
+    assert calls.round_trips == 2
+    [(_, query)] = calls.on("borrower")
+    assert _is_conditional(query, borrower_id, lender)
+
+
+def test_delete_borrower_is_one_conditional_write(client, lender, calls):
+    borrower_id = _borrower(client, lender)
+    calls.clear()
+
+    response = client.delete(f"/api/borrower/{borrower_id}", headers=lender["headers"])
+
+    assert response.json()["status"] == 200
+    assert calls.methods() == ["borrower.delete_one", "versions.find_one_and_update"]
+    assert calls.round_trips == 2
+    [(_, query)] = calls.on("borrower")
+    assert _is_conditional(query, borrower_id, lender)
+
+
+def test_other_lenders_borrower_is_not_deleted(client, lender, other_lender, calls):
+    borrower_id = _borrower(client, lender)
+    calls.clear()
+
+    response = client.delete(f"/api/borrower/{borrower_id}", headers=other_lender["headers"])
+
+    assert response.json()["status"] == 404
+    assert calls.methods() == ["borrower.delete_one"]
+    [(_, query)] = calls.on("borrower")
+    assert _is_conditional(query, borrower_id, other_lender)
+    assert client.get(f"/api/borrower/{borrower_id}", headers=lender["headers"]).json()["status"] == 200
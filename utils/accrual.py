@@ -0,0 +1,75 @@
+"""
+Vectorized simple-interest accrual.
+
+``interest_value`` is read the same way ``calculate_transaction_fields`` reads
+it (a percentage of principal or a flat amount) and is charged once per
+completed ``frequency`` period since ``transaction_date``. Transactions
+without a frequency carry their interest once, from the transaction date.
+"""
+from datetime import date
+import numpy as np
+
+FREQUENCY_CODES = {None: 0, "daily": 1, "monthly": 2, "yearly": 3}
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def completed_periods(start: np.ndarray, as_of: np.datetime64, frequency: np.ndarray) -> np.ndarray:
+    """Whole periods elapsed between each start date and as_of (0 when as_of is earlier)."""
+    start = start.astype("datetime64[D]")
+    as_of = np.datetime64(as_of, "D")
+
+    days = (as_of - start).astype(np.int64)
+
+    start_month = start.astype("datetime64[M]")
+    start_day = (start - start_month).astype(np.int64)
+    as_of_month = as_of.astype("datetime64[M]")
+    as_of_day = (as_of - as_of_month).astype(np.int64)
+    months = (as_of_month - start_month).astype(np.int64) - (as_of_day < start_day)
+
+    periods = np.select(
+        [frequency == 1, frequency == 2, frequency == 3, frequency == 0],
+        [days, months, months // 12, (days >= 0).astype(np.int64)],
+    )
+    return np.maximum(periods, 0)
+
+
+def accrue(principal, rate, is_percentage, frequency, transaction_date, as_of) -> tuple[np.ndarray, np.ndarray]:
+    """Return (accrued_interest, balance) arrays for a whole portfolio as of `as_of`."""
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(rate, dtype=np.float64)
+    per_period = np.where(is_percentage, principal * rate / 100, rate)
+    periods = completed_periods(np.asarray(transaction_date, dtype="datetime64[D]"), as_of, np.asarray(frequency))
+    accrued = per_period * periods
+    return accrued, principal + accrued
+
+
+def to_columns(txns: list[dict]) -> dict:
+    """Columnar arrays for accrue() from transaction documents."""
+    # One list comprehension and a single conversion per column: filling the
+    # arrays element by element costs far more than the accrual itself
+    return {
+        "principal": np.array(
+            [txn.get("adjusted_principal", txn.get("principal_amount")) or 0 for txn in txns], np.float64
+        ),
+        "rate": np.array([txn.get("interest_value") or 0 for txn in txns], np.float64),
+        "is_percentage": np.array([txn.get("interest_type") == "percentage" for txn in txns], bool),
+        "frequency": np.array([FREQUENCY_CODES.get(txn.get("frequency"), 0) for txn in txns], np.int8),
+        # Days since the epoch via toordinal() (which ignores the time of a
+        # datetime); numpy's own conversion of date objects is ~10x slower
+        "transaction_date": np.array(
+            [_epoch_day(txn.get("transaction_date")) for txn in txns],
+            np.int64
+        ).astype("datetime64[D]"),
+    }
+
+
+def _epoch_day(value) -> int:
+    if isinstance(value, date):  # datetimes too
+        return value.toordinal() - EPOCH_ORDINAL
+    return np.datetime64(value, "D").astype(np.int64)  # strings; None becomes NaT
+
+
+def accrue_documents(txns: list[dict], as_of: date) -> tuple[np.ndarray, np.ndarray]:
+    if not txns:
+        return np.zeros(0), np.zeros(0)
+    return accrue(as_of=np.datetime64(as_of, "D"), **to_columns(txns))
@@ -0,0 +1,166 @@
+"""
+Admission control: every request is classified by route, and each class gets
+its own adaptive concurrency limit and bounded FIFO wait queue. A spike of
+bcrypt sign-ins or heavy listings then only queues behind its own kind. When a
+class's queue is full, or a request has waited past its class's latency target,
+the client gets an immediate 503 with Retry-After instead of a slow timeout.
+"""
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from config import ADMISSION_CLASSES
+from utils.comman import custom_response
+from utils.metrics import Counter, Gauge
+
+# First match wins; anything unmatched (docs, /metrics) bypasses admission. The
+# optional query pattern must also match the query string.
+ROUTE_CLASSES = [
+    ("POST", re.compile(r"^/api/auth/(signin|signup)$"), None, "auth"),
+    (None, re.compile(r"^/api/[^/]+/(bulk|export)$"), None, "bulk"),
+    # Schedules stream, and as-of summaries accrue the whole portfolio
+    ("GET", re.compile(r"^/api/transaction/[^/]+/schedule$"), None, "bulk"),
+    ("GET", re.compile(r"^/api/transaction/summary(/[^/]+)?$"), re.compile(r"(^|&)as_of="), "bulk"),
+    ("GET", re.compile(r"^/api/transaction/summary(/[^/]+)?$"), None, "list"),
+    ("GET", re.compile(r"^/api/((borrower|transaction)/?|dashboard)$"), None, "list"),
+    ("GET", re.compile(r"^/api/"), None, "detail"),
+    (None, re.compile(r"^/api/"), None, "write"),
+]
+
+admission_limit = Gauge("admission_limit", "Current adaptive concurrency limit.", ("route_class",))
+admission_in_flight = Gauge("admission_in_flight", "Admitted requests being served.", ("route_class",))
+admission_queued = Gauge("admission_queued", "Requests waiting for a slot.", ("route_class",))
+admission_rejected = Counter("admission_rejected_total", "Requests shed with a 503.", ("route_class", "reason"))
+
+
+def classify(method: str, path: str, query: str = ""):
+    for route_method, pattern, query_pattern, route_class in ROUTE_CLASSES:
+        if route_method is not None and route_method != method:
+            continue
+        if pattern.match(path) and (query_pattern is None or query_pattern.search(query)):
+            return route_class
+    return None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by latency: completions under the target grow
+    the limit by 1/limit while it is saturated, and a completion over the target
+    cuts it by a quarter (at most once per target interval, so a single slow
+    burst doesn't collapse it to the floor).
+    """
+
+    def __init__(self, name: str, limit: int, max_limit: int, queue: int, target_ms: int):
+        self.name = name
+        self.limit = float(limit)
+        self.max_limit = max_limit
+        self.queue = queue
+        self.target = target_ms / 1000
+        self.in_flight = 0
+        self.latency = self.target / 2  # EWMA, seeds the Retry-After estimate
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        admission_limit.set(name, value=limit)
+
+    async def acquire(self) -> bool:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self._admit()
+            return True
+        if len(self._waiters) >= self.queue:
+            admission_rejected.inc(self.name, "queue_full")
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        admission_queued.inc(self.name)
+        try:
+            # Waiting longer than the target means the answer would be late anyway
+            await asyncio.wait_for(asyncio.shield(waiter), self.target)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():  # handed a slot just as the wait expired
+                return True
+            admission_rejected.inc(self.name, "queue_timeout")
+            return False
+        except asyncio.CancelledError:
+            if waiter.done():  # client went away after being admitted
+                self.release(None)
+            raise
+        finally:
+            admission_queued.dec(self.name)
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+
+    def _admit(self):
+        self.in_flight += 1
+        admission_in_flight.inc(self.name)
+
+    def release(self, latency):
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        admission_in_flight.dec(self.name)
+        if latency is not None:
+            self._adapt(latency, saturated)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            self._admit()
+            waiter.set_result(None)
+
+    def _adapt(self, latency: float, saturated: bool):
+        self.latency += (latency - self.latency) * 0.1
+        now = time.monotonic()
+        if latency > self.target:
+            if now - self._last_decrease > self.target:
+                self.limit = max(1.0, self.limit * 0.75)
+                self._last_decrease = now
+        elif saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        admission_limit.set(self.name, value=int(self.limit))
+
+    def retry_after(self) -> int:
+        # Time for the current queue to drain at the current limit
+        return max(1, math.ceil(self.latency * (len(self._waiters) + 1) / max(1, int(self.limit))))
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware; the slot is held until the response body (including
+    streams) is sent, but latency is measured to the start of the response so
+    a long download doesn't read as a slow server.
+    """
+
+    def __init__(self, app, classes: dict = None):
+        self.app = app
+        self.limiters = {
+            name: AdaptiveLimiter(name, **settings)
+            for name, settings in (classes or ADMISSION_CLASSES).items()
+        }
+
+    async def __call__(self, scope, receive, send):
+        route_class = None
+        if scope["type"] == "http":
+            route_class = classify(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        if route_class is None:
+            return await self.app(scope, receive, send)
+
+        limiter = self.limiters[route_class]
+        if not await limiter.acquire():
+            response = custom_response(503, "Server busy, please retry")
+            response.headers["Retry-After"] = str(limiter.retry_after())
+            return await response(scope, receive, send)
+
+        start = time.perf_counter()
+        latency = None
+
+        async def timed_send(message):
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            limiter.release(latency if latency is not None else time.perf_counter() - start)
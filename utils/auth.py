@@ -1,14 +1,89 @@
-from passlib.context import CryptContext
-from jose import jwt
-from config import SECRET_KEY, ALGORITHM
+from config import SECRET_KEY, ALGORITHM, PASSWORD_POOL, PASSWORD_WORKERS, PASSWORD_MAX_QUEUE
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional
+import asyncio
+
+_pwd_context = None
+
+
+def get_pwd_context():
+    # passlib/bcrypt are only needed by sign-up and sign-in, so they load on first use
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already waiting for a worker."""
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password, hashed_password):
+    # Returns (valid, new_hash); new_hash is set when the stored hash uses
+    # outdated CryptContext settings and should be replaced.
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 def create_token(data: dict):
+    from jose import jwt
     return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# bcrypt blocks for tens of milliseconds per call, so it runs on a bounded
+# pool instead of the event loop. At most PASSWORD_WORKERS calls run at once
+# and at most PASSWORD_MAX_QUEUE more may wait; anything beyond is rejected.
+_executor = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_waiting = 0
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        if PASSWORD_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+async def _run_in_pool(func, *args):
+    global _semaphore, _waiting
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PASSWORD_WORKERS)
+
+    if _semaphore.locked() and _waiting >= PASSWORD_MAX_QUEUE:
+        raise PasswordHasherBusy("Password hashing queue is full")
+
+    _waiting += 1
+    try:
+        await _semaphore.acquire()
+    finally:
+        _waiting -= 1
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        _semaphore.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(hash_password, password)
+
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    return await _run_in_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown_password_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
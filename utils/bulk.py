@@ -0,0 +1,90 @@
+import csv
+import json
+from typing import AsyncIterator, Union
+from config import BULK_MAX_LINE_BYTES
+
+
+def _too_long(max_line: int) -> ValueError:
+    return ValueError(f"Line longer than {max_line} bytes")
+
+
+def _decode(line: bytes, max_line: int) -> Union[str, ValueError]:
+    if len(line) > max_line:
+        return _too_long(max_line)
+    try:
+        return line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Invalid UTF-8 at byte {e.start}")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line: int = BULK_MAX_LINE_BYTES) -> AsyncIterator[Union[str, ValueError]]:
+    """
+    Split a byte stream into decoded lines without holding more than one
+    partial line of at most max_line bytes. A line that is too long or not
+    valid UTF-8 is yielded as a ValueError so it becomes a row error.
+    """
+    buffer = b""
+    skipping = False  # dropping the rest of an overlong line up to its newline
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            yield _decode(line, max_line)
+        if len(buffer) > max_line:
+            if not skipping:
+                yield _too_long(max_line)
+            skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield _decode(buffer, max_line)
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict]]:
+    """Yield (row_number, row) for a CSV stream with a header line."""
+    header = None
+    record = ""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if isinstance(line, ValueError):
+            record = ""
+            row_number += 1
+            yield row_number, line
+            continue
+        record = f"{record}\n{line}" if record else line
+        if len(record) > BULK_MAX_LINE_BYTES:
+            # An unbalanced quote would otherwise swallow the rest of the upload
+            record = ""
+            row_number += 1
+            yield row_number, _too_long(BULK_MAX_LINE_BYTES)
+            continue
+        # A quoted field may contain newlines; wait until the quotes balance
+        if record.count('"') % 2:
+            continue
+        values, record = next(csv.reader([record]), []), ""
+        if not values:
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        row_number += 1
+        yield row_number, dict(zip(header, values))
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    """Yield (row_number, row) for newline-delimited JSON; unparsable lines yield the ValueError."""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if isinstance(line, ValueError):
+            row_number += 1
+            yield row_number, line
+            continue
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, e
@@ -2,34 +2,98 @@ from fastapi.responses import JSONResponse
 from typing import Any, Optional
 from datetime import datetime,date, time
 from fastapi.exceptions import RequestValidationError
-from bson import ObjectId
+from bson import ObjectId, json_util
+from bson.decimal128 import Decimal128
 from datetime import datetime
+from decimal import Decimal
+import base64
 import math
+import orjson
 
 
+def _encode_default(value):
+    # orjson handles dict/list/str/numbers/datetime/date natively at any depth
+    # and calls this only for the BSON types it doesn't know.
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse that encodes raw Mongo documents in one orjson pass."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
 
 def custom_response(status: int = 200, message: str = "", rest: Optional[Any] = None):
-    collection ={
-            "status": status,
-            "message": message
-    }
-    if rest:
-        collection.update(rest)
-    return JSONResponse(
+    return MongoJSONResponse(
         status_code=status,
-        content=collection
+        content={"status": status, "message": message, **rest} if rest else {"status": status, "message": message}
     )
 
-def custom_pagination_response(page: int, limit: int, total_count: int, docs: list):
-    total_pages = math.ceil(total_count / limit)  # Calculate total pages
+def custom_pagination_response(page: int, limit: int, total_count: Optional[int], docs: list, next_cursor: Optional[str] = None, has_more: Optional[bool] = None, count_capped: bool = False):
+    # total_count is None when the client opted out of counting (?count=false);
+    # a capped estimate only bounds the total from below, so no page count either
+    total_pages = math.ceil(total_count / limit) if total_count is not None and not count_capped else None  # Calculate total pages
     return {
             "docs": docs,
             "page": page,
             "pages": total_pages,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "count_capped": count_capped
     }
 
 
+# Keyset pagination: the cursor is an opaque token holding the sort value and
+# _id of the last row on the previous page, so deep pages never need skip().
+
+def encode_cursor(doc: dict, sort_field: str = "_id") -> str:
+    payload = {"id": doc["_id"]}
+    if sort_field != "_id":
+        # The sort is recorded so the value is never compared against another field
+        payload["s"] = sort_field
+        payload["v"] = doc.get(sort_field)
+    raw = json_util.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw)
+        if not isinstance(payload.get("id"), ObjectId):
+            raise ValueError
+        return payload
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(cursor: dict, sort_field: str = "_id") -> dict:
+    """Filter selecting rows after `cursor` for a (sort_field DESC, _id DESC) sort."""
+    if cursor.get("s", "_id") != sort_field:
+        raise ValueError("Cursor was issued for a different sort order")
+    if sort_field == "_id":
+        return {"_id": {"$lt": cursor["id"]}}
+
+    value = cursor.get("v")
+    if value is None:
+        # Missing/null values sort last in descending order
+        return {sort_field: None, "_id": {"$lt": cursor["id"]}}
+    return {"$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "_id": {"$lt": cursor["id"]}},
+        {sort_field: None}
+    ]}
+
+
 
 def convert_dates(val):
     if isinstance(val, date) and not isinstance(val, datetime):
@@ -56,8 +120,14 @@ async def validation_exception_handler(request, exc: RequestValidationError):
 def serialize_value(value):
     if isinstance(value, ObjectId):
         return str(value)
-    if isinstance(value, datetime):
+    if isinstance(value, (datetime, date)):
         return value.isoformat()
+    if isinstance(value, (Decimal128, Decimal)):
+        return _encode_default(value)
+    if isinstance(value, dict):
+        return serialize_mongo_document(value)
+    if isinstance(value, list):
+        return [serialize_value(item) for item in value]
     return value
 
 def serialize_mongo_document(doc: dict) -> dict:
@@ -0,0 +1,42 @@
+from bson import json_util
+from typing import Literal, Optional
+from config import COUNT_CACHE_SIZE, COUNT_CACHE_TTL, COUNT_ESTIMATE_CAP
+from utils.cache import TTLCache
+from utils.versions import lender_version
+
+# exact: cached exact count, estimated: count capped at COUNT_ESTIMATE_CAP,
+# false: no count at all (clients use has_more instead)
+CountMode = Literal["exact", "estimated", "false"]
+
+count_cache = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+
+
+# Keys carry the lender's version, so any write orphans all of their cached
+# counts at once; the orphaned entries simply age out of the LRU. Take the key
+# before counting: a write landing mid-count then orphans the result too.
+async def count_key(collection_name: str, lender_id: str, query: dict) -> tuple:
+    return (
+        collection_name,
+        lender_id,
+        await lender_version(lender_id),
+        json_util.dumps(query, sort_keys=True),
+    )
+
+
+def count_capped(mode: CountMode, total: Optional[int]) -> bool:
+    """True when an estimated count stopped at COUNT_ESTIMATE_CAP, i.e. the real total may be higher."""
+    return mode == "estimated" and total is not None and total >= COUNT_ESTIMATE_CAP
+
+
+async def count_documents(collection, lender_id: str, query: dict, mode: CountMode = "exact") -> Optional[int]:
+    if mode == "false":
+        return None
+    if mode == "estimated":
+        return await collection.count_documents(query, limit=COUNT_ESTIMATE_CAP)
+
+    key = await count_key(collection.name, lender_id, query)
+    total = count_cache.get(key)
+    if total is None:
+        total = await collection.count_documents(query)
+        count_cache.set(key, total)
+    return total
@@ -0,0 +1,40 @@
+import csv
+import io
+from typing import AsyncIterator
+from utils.comman import serialize_mongo_document, dumps
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+async def iter_batches(cursor, batch_size: int) -> AsyncIterator[list[dict]]:
+    """Group a Motor cursor into lists of at most batch_size documents."""
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def encode_rows(batches: AsyncIterator[list[dict]], fmt: str, columns: list[str]) -> AsyncIterator[bytes]:
+    """Serialize document batches as CSV or NDJSON, one chunk per batch."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+        async for batch in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            for doc in batch:
+                row = serialize_mongo_document(doc)
+                writer.writerow(["" if row.get(column) is None else row.get(column) for column in columns])
+            yield buffer.getvalue().encode()
+    else:
+        async for batch in batches:
+            yield b"".join(dumps({column: doc.get(column) for column in columns}) + b"\n" for doc in batch)
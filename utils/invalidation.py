@@ -0,0 +1,129 @@
+"""
+Cross-worker cache invalidation bus.
+
+In-process caches (user profiles, the cached lender versions behind counts and
+ETags) are per worker. With several workers or instances, every invalidation is also
+written to the `invalidations` collection. Each worker follows that
+collection and replays other workers' events locally. It uses a change stream
+where the deployment supports one (replica sets, Atlas). On a standalone
+mongod it polls instead.
+"""
+import asyncio
+import logging
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+from config import INVALIDATION_BUS, INVALIDATION_POLL_INTERVAL
+
+COLLECTION = "invalidations"
+ORIGIN = secrets.token_hex(8)  # identifies this worker's own events
+
+logger = logging.getLogger("uvicorn.error")
+_handlers: dict[str, Callable[[str], None]] = {}
+_resets: list[Callable[[], None]] = []
+_pending: set[asyncio.Task] = set()
+
+
+def subscribe(kind: str, handler: Callable[[str], None], reset: Callable[[], None]):
+    """
+    Register the local eviction for `kind`, run for other workers' events, and
+    a `reset` that drops everything, run whenever the bus (re)starts following
+    and may have missed events.
+    """
+    _handlers[kind] = handler
+    _resets.append(reset)
+
+
+def _reset():
+    for reset in _resets:
+        reset()
+
+
+def publish(kind: str, key: str):
+    """Tell other workers to evict `key`. The local eviction is the caller's job."""
+    if not INVALIDATION_BUS:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # plain synchronous scripts have nothing to schedule on
+        return
+    # Fire and forget: the write path never waits on the bus
+    task = loop.create_task(_insert(kind, key))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def flush():
+    """Wait for pending publishes; jobs call this before exiting so servers hear about their writes."""
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+
+
+async def _insert(kind: str, key: str):
+    import database
+
+    try:
+        await database.get_database()[COLLECTION].insert_one({
+            "kind": kind, "key": key, "origin": ORIGIN, "at": datetime.now(timezone.utc),
+        })
+    except PyMongoError as e:
+        logger.warning(f"Invalidation publish failed ({kind} {key}): {str(e)}")
+
+
+def _apply(event: dict):
+    handler = _handlers.get(event.get("kind"))
+    if handler is not None and event.get("origin") != ORIGIN:
+        handler(event["key"])
+
+
+async def _watch(collection):
+    pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": ORIGIN}}}]
+    async with collection.watch(pipeline) as stream:
+        logger.info("Invalidation bus following change stream")
+        _reset()
+        async for change in stream:
+            _apply(change["fullDocument"])
+
+
+async def _poll(collection):
+    logger.info(f"Invalidation bus polling every {INVALIDATION_POLL_INTERVAL}s")
+    # ObjectIds from different processes are only ordered to the second, so each
+    # poll re-reads a short overlap and skips events it has already applied
+    overlap = timedelta(seconds=max(2.0, INVALIDATION_POLL_INTERVAL * 2))
+    since = datetime.now(timezone.utc)
+    seen: dict[ObjectId, datetime] = {}
+    _reset()
+    while True:
+        await asyncio.sleep(INVALIDATION_POLL_INTERVAL)
+        floor = ObjectId.from_datetime(since - overlap)
+        async for event in collection.find({"_id": {"$gte": floor}, "origin": {"$ne": ORIGIN}}).sort("_id", 1):
+            if event["_id"] not in seen:
+                seen[event["_id"]] = event["_id"].generation_time
+                _apply(event)
+        since = datetime.now(timezone.utc)
+        cutoff = since - overlap * 2
+        seen = {_id: at for _id, at in seen.items() if at >= cutoff}
+
+
+async def run():
+    """Follow other workers' invalidations until cancelled. Started from the app lifespan."""
+    import database
+
+    collection = database.get_database()[COLLECTION]
+    while True:
+        try:
+            try:
+                await _watch(collection)
+            except OperationFailure as e:
+                # 40573: change streams need a replica set; standalone mongod polls instead
+                if e.code != 40573:
+                    raise
+                await _poll(collection)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Missed events only cost freshness; caches still expire on their TTLs
+            logger.warning(f"Invalidation bus interrupted, retrying: {str(e)}")
+            await asyncio.sleep(INVALIDATION_POLL_INTERVAL)
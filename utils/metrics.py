@@ -0,0 +1,209 @@
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms rendered in
+the text exposition format, plus request and Mongo command instrumentation.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from pymongo import monitoring
+
+# The ASGI scope of the request being served; routing fills in scope["route"]
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+# The service function currently issuing database commands
+current_service: ContextVar[str] = ContextVar("current_service", default="")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # Mongo events arrive on Motor's executor threads
+        REGISTRY.append(self)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+mongo_latency = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by issuing route and service.",
+    ("command", "route", "service"), DB_BUCKETS
+)
+mongo_failures = Counter("mongo_command_failures_total", "Failed MongoDB commands.", ("command", "route", "service"))
+
+
+def route_label(scope: Optional[dict]) -> str:
+    """The matched path template, e.g. /api/borrower/{borrower_id}, so label cardinality stays bounded."""
+    if scope is None:
+        return ""
+    template = getattr(scope.get("route"), "path_format", None)
+    if template is None:
+        return "unmatched"
+    # Newer FastAPI keeps the router's own route (without the include prefix) in the
+    # scope; recover the prefix from the leading segments of the concrete path
+    parts = scope["path"].split("/")
+    depth = len(parts) - template.count("/")
+    return "/".join(parts[:depth]) + template if depth > 1 else template
+
+
+def _cache_lines(caches: dict) -> list[str]:
+    """Render TTLCache.stats() snapshots, which live outside the registry, as gauges."""
+    lines = []
+    for stat, kind in (("hits", "counter"), ("misses", "counter"), ("size", "gauge")):
+        name = f"app_cache_{stat}_total" if kind == "counter" else f"app_cache_{stat}"
+        lines += [f"# HELP {name} Cache {stat}.", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{cache="{_escape(cache)}"}} {stats[stat]}' for cache, stats in caches.items()]
+    return lines
+
+
+def render(caches: Optional[dict] = None) -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    if caches:
+        lines += _cache_lines(caches)
+    return "\n".join(lines) + "\n"
+
+
+def instrumented(func):
+    """Attribute database commands issued inside an async service function to it."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_service.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_service.reset(token)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering) recording HTTP metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = current_scope.set(scope)
+        http_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            current_scope.reset(token)
+            route = route_label(scope)
+            http_latency.observe(time.perf_counter() - start, method, route)
+            http_requests.inc(method, route, str(status))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command and attributes it to the route and service that issued it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, event.command_name, route_label(current_scope.get()), current_service.get())
+
+    def failed(self, event):
+        labels = (event.command_name, route_label(current_scope.get()), current_service.get())
+        mongo_latency.observe(event.duration_micros / 1e6, *labels)
+        mongo_failures.inc(*labels)
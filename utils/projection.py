@@ -0,0 +1,24 @@
+from typing import Iterable, Optional
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[list[str]]:
+    """Parse a ?fields=a,b,c parameter; None means every field. Raises ValueError on unknown names."""
+    if not fields:
+        return None
+    allowed = set(allowed)
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return requested
+
+
+def build_projection(fields: list[str], *extra: str) -> dict:
+    """Inclusion projection for the requested fields plus any the server needs itself."""
+    return {field: 1 for field in ("_id", *fields, *extra)}
+
+
+def trim(doc: dict, fields: Optional[list[str]]) -> dict:
+    if fields is None:
+        return doc
+    return {key: doc[key] for key in ("_id", *fields) if key in doc}
@@ -0,0 +1,93 @@
+"""
+Lazily generated accrual schedules.
+
+A transaction charges its per-period interest (see ``calculate_transaction_fields``)
+at the end of every ``frequency`` period after ``transaction_date``, with the
+same period boundaries ``utils.accrual`` uses: a monthly period starting on the
+31st completes on the 1st of the following month when the month is shorter.
+Transactions without a frequency have a single entry on the transaction date.
+
+Schedules are open ended, so they are only ever produced by a generator and
+positioned arithmetically: jumping to a ``start`` date is O(1), never a walk.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def per_period_interest(txn: dict) -> float:
+    principal = txn.get("adjusted_principal", txn.get("principal_amount")) or 0
+    rate = txn.get("interest_value") or 0
+    return principal * rate / 100 if txn.get("interest_type") == "percentage" else rate
+
+
+def _add_months(start: date, months: int) -> date:
+    year, month = divmod(start.month - 1 + months, 12)
+    year, month = start.year + year, month + 1
+    if start.day <= calendar.monthrange(year, month)[1]:
+        return date(year, month, start.day)
+    # The period only completes once the start day has passed, i.e. on the 1st
+    return date(year + month // 12, month % 12 + 1, 1)
+
+
+def due_date(start: date, frequency: Optional[str], period: int) -> date:
+    if frequency == "daily":
+        return start + timedelta(days=period)
+    if frequency == "monthly":
+        return _add_months(start, period)
+    if frequency == "yearly":
+        return _add_months(start, 12 * period)
+    return start
+
+
+def first_period_on_or_after(start: date, frequency: Optional[str], day: date) -> int:
+    """The first period (1-based) whose due date is on or after `day`."""
+    if frequency == "daily":
+        return max(1, (day - start).days)
+    if frequency in ("monthly", "yearly"):
+        months = (day.year - start.year) * 12 + day.month - start.month
+        period = max(1, (months if frequency == "monthly" else months // 12) - 1)
+        while due_date(start, frequency, period) < day:
+            period += 1
+        return period
+    return 1
+
+
+def iter_schedule(txn: dict, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[dict]:
+    """Yield schedule entries due within [start, end]; unbounded when `end` is None."""
+    opened = _as_date(txn["transaction_date"])
+    frequency = txn.get("frequency")
+    principal = txn.get("adjusted_principal", txn.get("principal_amount")) or 0
+    interest = per_period_interest(txn)
+
+    period = first_period_on_or_after(opened, frequency, start) if start else 1
+    while True:
+        due = due_date(opened, frequency, period)
+        if (end is not None and due > end) or (start is not None and due < start):
+            return
+        yield {
+            "period": period,
+            "due_date": due,
+            "interest": interest,
+            "accrued_interest": interest * period,
+            "balance": principal + interest * period,
+        }
+        if frequency not in ("daily", "monthly", "yearly"):
+            return
+        period += 1
+
+
+def schedule_summary(txn: dict, today: Optional[date] = None) -> dict:
+    """The next due date and amount, stored on the transaction for list views."""
+    today = today or date.today()
+    upcoming = next(iter_schedule(txn, start=today), None)
+    if upcoming is None:
+        return {"next_due_date": None, "next_due_amount": None}
+    return {
+        "next_due_date": datetime.combine(upcoming["due_date"], datetime.min.time()),
+        "next_due_amount": upcoming["interest"],
+    }
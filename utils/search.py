@@ -0,0 +1,67 @@
+import unicodedata
+
+# Prefixes longer than this aren't stored; longer search terms are truncated
+# to it, which can only widen (never narrow) the match.
+MAX_PREFIX = 15
+SEARCH_FIELDS = ("first_name", "last_name", "email")
+
+# Words are runs of letters, digits and combining marks in any script. Python's
+# \w leaves out the marks, which would split e.g. Devanagari words apart.
+WORD_CATEGORIES = ("L", "N", "M")
+# Matches no borrower, for a non-blank search that has no words at all
+NO_MATCH = {"search_tokens": {"$in": []}}
+
+
+def normalize(value: str) -> str:
+    return unicodedata.normalize("NFKC", value or "").casefold().strip()
+
+
+def tokenize(value: str) -> list[str]:
+    tokens, word = [], []
+    for char in normalize(value):
+        if unicodedata.category(char)[0] in WORD_CATEGORIES:
+            word.append(char)
+        elif word:
+            tokens.append("".join(word))
+            word = []
+    if word:
+        tokens.append("".join(word))
+    return tokens
+
+
+def prefixes(token: str) -> list[str]:
+    token = token[:MAX_PREFIX]
+    return [token[:i] for i in range(1, len(token) + 1)]
+
+
+def build_search_fields(doc: dict) -> dict:
+    """Fields stored on a borrower so search can be served by the (lender_id, search_tokens) index."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        for token in tokenize(doc.get(field, "")):
+            tokens.update(prefixes(token))
+    return {
+        "search_keys": [normalize(doc.get(field, "")) for field in SEARCH_FIELDS],
+        "search_tokens": sorted(tokens),
+    }
+
+
+def search_query(search: str) -> dict:
+    """Query clause matching borrowers that have a word starting with every search term."""
+    terms = [term[:MAX_PREFIX] for term in tokenize(search)]
+    if not terms:
+        return NO_MATCH if normalize(search) else {}
+    return {"search_tokens": {"$all": terms}}
+
+
+def search_score_stage(search: str) -> dict:
+    """$addFields stage ranking matches: exact field match > field prefix > word prefix."""
+    needle = normalize(search)
+    return {"$addFields": {"search_score": {"$max": {"$map": {
+        "input": {"$ifNull": ["$search_keys", []]},
+        "as": "key",
+        "in": {"$cond": [
+            {"$eq": ["$$key", needle]}, 3,
+            {"$cond": [{"$eq": [{"$indexOfCP": ["$$key", needle]}, 0]}, 2, 1]}
+        ]}
+    }}}}}
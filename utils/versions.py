@@ -0,0 +1,73 @@
+"""
+Per-lender change versions. Every borrower or transaction write bumps the
+lender's version; cached counts key on it and list/detail reads derive their
+ETags from it, so a poll that finds nothing new is answered with a 304.
+
+The counter lives in the `versions` collection, so every worker, instance and
+job agrees on it and a poll gets its 304 whichever worker it lands on. Workers
+cache it briefly; the invalidation bus evicts that cache as soon as another
+process writes.
+"""
+import hashlib
+from datetime import date
+from typing import Awaitable, Callable
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+from config import VERSION_CACHE_SIZE, VERSION_CACHE_TTL
+from database import versions_collection
+from utils import invalidation
+from utils.cache import TTLCache
+
+version_cache = TTLCache(maxsize=VERSION_CACHE_SIZE, ttl=VERSION_CACHE_TTL)
+
+invalidation.subscribe("lender", version_cache.pop, version_cache.clear)
+
+
+async def bump_lender_version(lender_id: str) -> int:
+    doc = await versions_collection.find_one_and_update(
+        {"_id": lender_id}, {"$inc": {"v": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    version_cache.set(lender_id, doc["v"])
+    invalidation.publish("lender", lender_id)
+    return doc["v"]
+
+
+async def lender_version(lender_id: str) -> int:
+    version = version_cache.get(lender_id)
+    if version is None:
+        doc = await versions_collection.find_one({"_id": lender_id})
+        version = doc["v"] if doc else 0
+        version_cache.set(lender_id, version)
+    return version
+
+
+async def lender_etag(request: Request, lender_id: str) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    # Responses also depend on today's date (next due dates, the dashboard's
+    # months), so a tag never outlives the day it was issued
+    raw = f"{lender_id}:{await lender_version(lender_id)}:{date.today().isoformat()}:{request.url.path}?{query}"
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored on both sides
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+async def conditional(request: Request, lender_id: str, produce: Callable[[], Awaitable[Response]]) -> Response:
+    """Answer 304 when the client's ETag is current, otherwise run `produce` and tag its response."""
+    # Taken before the query runs: a write landing mid-query bumps the version,
+    # so the worst case is one extra full response on the next poll, never a stale 304
+    etag = await lender_etag(request, lender_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await produce()
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response